@@ -1,13 +1,20 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
+import os
 import random
-from optimizer import optimize_schedule_lp, format_schedule_readable
-from train_agent_with_preferences import train_agent_with_preferences, run_agent_with_preferences, calculate_comfort_score
-from fetch_live_prices import fetch_comed_prices
+from optimizer import format_schedule_readable
+from pareto import pareto_frontier
+from policy_cache import problem_fingerprint
+from optimization_jobs import JobCancelled, JobManager
 from utils.appliance_data import appliance_defaults
+from utils.comfort_score import calculate_comfort_score
+from utils.time_slots import MAX_HORIZON_HOURS
+from utils.tracing import TRACE_PATH, span, tracer
 from datetime import datetime
 
+# Spans of every request go to data/traces.jsonl unless WATTYOUSAVE_TRACE says otherwise
+tracer.export_path = tracer.export_path or TRACE_PATH
+
 # -------------------------------
 # Page setup
 # -------------------------------
@@ -58,12 +65,26 @@ st.markdown('<p class="sub-header">Optimize your appliance schedule using AI tha
 # Fetch prices (CACHED)
 # -------------------------------
 @st.cache_data(ttl=3600)
-def get_prices():
-    return fetch_comed_prices()
+def get_prices(hours=24):
+    # Imported here so the page header renders before requests/pytz load
+    from fetch_live_prices import fetch_comed_prices
+    return fetch_comed_prices(hours)
+
+horizon_hours = st.select_slider(
+    "Planning horizon (hours)",
+    options=[24, 48, 72, 120, MAX_HORIZON_HOURS],
+    value=24,
+    help="Schedule over one day or up to a full week of prices"
+)
 
-if 'df_prices' not in st.session_state:
+prices_request = None
+if st.session_state.get('price_horizon') != horizon_hours:
     with st.spinner("Fetching latest ComEd day-ahead prices..."):
-        st.session_state.df_prices = get_prices()
+        with span("load_prices", root=True, horizon=horizon_hours) as prices_request:
+            st.session_state.df_prices = get_prices(horizon_hours)
+        st.session_state.price_horizon = horizon_hours
+        # This session's traces only: the tracer is shared by every session in the process
+        st.session_state.prices_trace = prices_request["trace_id"]
 
 df_prices = st.session_state.df_prices
 
@@ -74,6 +95,8 @@ st.subheader("Day-Ahead Electricity Prices")
 st.caption("All times shown in **Central Time (CT)** - ComEd service area")
 
 if df_prices is not None and not df_prices.empty:
+    import plotly.graph_objects as go
+
     # Create professional Plotly chart
     fig = go.Figure()
 
@@ -126,7 +149,7 @@ if df_prices is not None and not df_prices.empty:
     # Styling
     fig.update_layout(
         title=dict(
-            text="Hourly Electricity Prices - Next 24 Hours (Central Time)",
+            text=f"Hourly Electricity Prices - Next {horizon_hours} Hours (Central Time)",
             font=dict(size=16, color='#333')
         ),
         xaxis_title="Time (Central Time)",
@@ -153,7 +176,9 @@ if df_prices is not None and not df_prices.empty:
     fig.update_xaxes(fixedrange=True)
     fig.update_yaxes(fixedrange=True)
 
-    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    # Part of the page load that fetched these prices; untraced on other reruns
+    with tracer.resume(prices_request), span("plotly_render", chart="prices", points=len(df_prices)):
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
 
     # Stats below chart
     col1, col2, col3, col4 = st.columns(4)
@@ -250,6 +275,23 @@ with col2:
         help="When restrictions end (e.g., wake up time)"
     )
 
+def clock_hour(time_str):
+    """Hour of day (0-23) of a price label such as 03:00 PM or Tue 03:00 PM"""
+    return datetime.strptime(" ".join(time_str.split()[-2:]), "%I:%M %p").hour
+
+def hours_of_day_to_indices(hours, df_prices):
+    """Every price index whose clock hour is in hours (repeats once per day of the horizon)"""
+    indices = []
+    if df_prices is None or df_prices.empty:
+        return indices
+    for idx, time_str in enumerate(df_prices['time']):
+        try:
+            if clock_hour(time_str) in hours:
+                indices.append(idx)
+        except ValueError:
+            continue
+    return indices
+
 def time_to_indices(start_time, end_time, df_prices):
     """Convert clock times to array indices"""
     restricted_indices = []
@@ -260,8 +302,7 @@ def time_to_indices(start_time, end_time, df_prices):
     for idx, row in df_prices.iterrows():
         time_str = row['time']
         try:
-            time_obj = datetime.strptime(time_str, "%I:%M %p").time()
-            hour = time_obj.hour
+            hour = clock_hour(time_str)
             if start_hour <= end_hour:
                 if start_hour <= hour < end_hour:
                     restricted_indices.append(idx)
@@ -281,8 +322,7 @@ if df_prices is not None and not df_prices.empty:
         if idx < len(df_prices):
             time_str = df_prices.iloc[idx]['time']
             try:
-                time_obj = datetime.strptime(time_str, "%I:%M %p").time()
-                restricted_hour_numbers.add(time_obj.hour)
+                restricted_hour_numbers.add(clock_hour(time_str))
             except:
                 pass
 
@@ -539,11 +579,11 @@ with st.expander("Customize Individual Preferences", expanded=False):
         st.session_state.preference_selections[unique_key]['avoid_penalty'] = avoid_penalty
         st.session_state.preference_selections[unique_key]['prefer_bonus'] = prefer_bonus
 
-        # Build preferences dict for this appliance
+        # Build preferences dict for this appliance (clock hours -> price indices, every day of the horizon)
         preferences[appliance_name] = {
-            'avoid_hours': list(st.session_state.preference_selections[unique_key]['avoid']),
+            'avoid_hours': hours_of_day_to_indices(st.session_state.preference_selections[unique_key]['avoid'], df_prices),
             'avoid_penalty': avoid_penalty,
-            'preferred_hours': list(st.session_state.preference_selections[unique_key]['prefer']),
+            'preferred_hours': hours_of_day_to_indices(st.session_state.preference_selections[unique_key]['prefer'], df_prices),
             'preferred_bonus': prefer_bonus
         }
 
@@ -572,170 +612,235 @@ def sanitize_score(x, low=1.0, high=2.6):
     except:
         return round(random.uniform(low, high), 2)
 
+def render_timing_panel(spans):
+    """Nested stage timings (and memory deltas with WATTYOUSAVE_TRACE_MEMORY=1) recorded by utils.tracing"""
+    if not spans:
+        return
+    table = {
+        "Stage": ["\u2003" * s["depth"] + s["name"] for s in spans],
+        "Time (ms)": [round(s["duration_ms"], 1) for s in spans],
+    }
+    if all("rss_delta_bytes" in s for s in spans):
+        table["Memory Δ (MB)"] = [round(s["rss_delta_bytes"] / 2**20, 1) for s in spans]
+    with st.expander("⏱️ Timing", expanded=True):
+        st.dataframe(pd.DataFrame(table), use_container_width=True, hide_index=True)
+
+@st.cache_resource
+def get_job_manager():
+    """One worker pool for every session; WATTYOUSAVE_JOB_WORKERS sizes it."""
+    return JobManager(max_workers=int(os.environ.get("WATTYOUSAVE_JOB_WORKERS", 2)))
+
 # -------------------------------
 # OPTIMIZATION WITH COOL VISUALIZATION
 # -------------------------------
 st.subheader("Run Optimization")
 
-if st.button("⚡ Optimize Schedule", type="primary", use_container_width=True):
+show_timing = st.checkbox("Show timing panel", value=False, help="Where the time went in the last optimization")
 
-    if len(prices) == 0:
-        st.error("No price data available!")
-    else:
-        # Validate that scheduling is possible
-        total_required_hours = sum(a['duration'] for a in appliances)
-        available_hours = len(prices) - len(restricted_hours)
-
-        if available_hours < total_required_hours:
-            st.error(f"⚠️ Impossible to schedule! You have {total_required_hours} hours of appliance runtime but only {available_hours} available hours (after restrictions). Please reduce restrictions or appliance durations.")
-            st.stop()
-        # Create visualization containers
-        progress_container = st.container()
-        viz_container = st.container()
-
-        with progress_container:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
-        # LINEAR PROGRAMMING
-        with viz_container:
-            st.markdown("### Optimization in Progress")
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                lp_status = st.empty()
-                lp_status.info("Linear Programming...")
+jobs = get_job_manager()
+active_job = st.session_state.get("optimize_job")
 
-        status_text.text("Running Linear Programming optimization...")
-        progress_bar.progress(25)
+# Inputs changed since the last click: that job is no longer wanted
+if active_job is not None and active_job.key != problem_fingerprint(prices, appliances, restricted_hours, preferences):
+    jobs.cancel(active_job)
+    st.session_state.optimize_job = active_job = None
 
-        lp_schedule, lp_cost = optimize_schedule_lp(prices, appliances, restricted_hours)
-        lp_readable = format_schedule_readable(lp_schedule, appliances)
+optimize_clicked = st.button("⚡ Optimize Schedule", type="primary", use_container_width=True)
 
-        with col1:
-            lp_status.success("✅ LP Complete!")
+# A rerun while the job is still going (e.g. another widget changed) picks its progress back up
+if optimize_clicked or (active_job is not None and not active_job.done()):
 
-        # REINFORCEMENT LEARNING
-        with col2:
-            rl_status = st.empty()
-            rl_status.info("⏳ Training AI...")
-
-        status_text.text("Training AI with your preferences...")
-
-        # Create a nice progress animation for RL training
-        for i in range(25, 75, 5):
-            progress_bar.progress(i)
-            import time
-            time.sleep(0.1)
-
-        model = train_agent_with_preferences(prices, appliances, restricted_hours, preferences)
-
-        with col2:
-            rl_status.success("✅ AI Trained!")
-
-        # Generate schedule
-        with col3:
-            gen_status = st.empty()
-            gen_status.info("Generating Schedule...")
-
-        status_text.text("Generating optimized schedule...")
-        progress_bar.progress(85)
-
-        rl_schedule = run_agent_with_preferences(model, prices, appliances, restricted_hours, preferences)
-
-        # Validate that RL schedule is not empty
-        if all(len(rl_schedule.get(a['name'], [])) == 0 for a in appliances):
-            st.error("⚠️ AI failed to generate a schedule. This may happen with very restrictive settings. Try reducing time restrictions or adjusting preferences.")
-            # Fall back to LP schedule for RL
-            rl_schedule = lp_schedule.copy()
-            st.warning("Using Linear Programming schedule as fallback for AI with Preferences.")
-
-        rl_readable = format_schedule_readable(rl_schedule, appliances)
+    if len(prices) == 0:
+        st.error("No price data available!")
+    else:
+        with span("optimize_request", root=True, horizon=len(prices), appliances=len(appliances)) as request:
+            # Validate that scheduling is possible
+            total_required_hours = sum(a['duration'] for a in appliances)
+            available_hours = len(prices) - len(restricted_hours)
+
+            if available_hours < total_required_hours:
+                st.error(f"⚠️ Impossible to schedule! You have {total_required_hours} hours of appliance runtime but only {available_hours} available hours (after restrictions). Please reduce restrictions or appliance durations.")
+                st.stop()
+            # Create visualization containers
+            progress_container = st.container()
+            viz_container = st.container()
+
+            with progress_container:
+                progress_bar = st.progress(0)
+                status_text = st.empty()
+
+            # LINEAR PROGRAMMING
+            with viz_container:
+                st.markdown("### Optimization in Progress")
+                col1, col2, col3 = st.columns(3)
+
+                with col1:
+                    lp_status = st.empty()
+                    lp_status.info("Linear Programming...")
+
+                # REINFORCEMENT LEARNING
+                with col2:
+                    rl_status = st.empty()
+                    rl_status.info("⏳ Training AI...")
+
+                # Generate schedule
+                with col3:
+                    gen_status = st.empty()
+                    gen_status.info("Generating Schedule...")
+
+            # LP and RL run side by side in the worker pool. The generalist,
+            # a cached policy or a training run (with live progress) covers
+            # the RL path; this session only renders.
+            if active_job is None or active_job.done():
+                try:
+                    job = jobs.submit(prices, appliances, restricted_hours, preferences)
+                except RuntimeError as e:
+                    st.warning(f"⚠️ {e}")
+                    st.stop()
+                st.session_state.optimize_job = job
+            else:
+                job = active_job
+
+            def show_progress(job):
+                progress_bar.progress(min(int(100 * job.fraction), 100))
+                status_text.text(job.stage["rl"] if job.progress["lp"] >= 1 else job.stage["lp"])
+                if job.progress["lp"] >= 1:
+                    lp_status.success("✅ LP Complete!")
+                if job.progress["rl"] >= 0.9:
+                    rl_status.success("✅ AI Trained!")
+
+            with span("wait_for_job", job=job.job_id):
+                jobs.wait(job, on_progress=show_progress)
+            try:
+                results = job.result()
+            except JobCancelled:
+                st.stop()
+            except Exception as e:
+                st.error(f"⚠️ Optimization failed: {e}")
+                st.stop()
+
+            # Label slots with the fetched price times (first price hour, weekday on multi-day horizons)
+            slot_times = list(df_prices["time"])
+            lp_schedule, lp_cost = results["lp"]["schedule"], results["lp"]["cost"]
+            lp_readable = format_schedule_readable(lp_schedule, appliances, slot_times=slot_times)
+            rl_schedule = results["rl"]["schedule"]
+            worker_spans = [dict(s, depth=s["depth"] + 1) for r in results.values() for s in r["spans"]]
+
+            # Validate that RL schedule is not empty
+            if all(len(rl_schedule.get(a['name'], [])) == 0 for a in appliances):
+                st.error("⚠️ AI failed to generate a schedule. This may happen with very restrictive settings. Try reducing time restrictions or adjusting preferences.")
+                # Fall back to LP schedule for RL
+                rl_schedule = lp_schedule.copy()
+                st.warning("Using Linear Programming schedule as fallback for AI with Preferences.")
+
+            rl_readable = format_schedule_readable(rl_schedule, appliances, slot_times=slot_times)
+
+            rl_cost = sum(
+                prices[h] * a['power']
+                for a in appliances
+                for h in rl_schedule[a['name']]
+            )
 
-        rl_cost = sum(
-            prices[h] * a['power']
-            for a in appliances
-            for h in rl_schedule[a['name']]
-        )
+            # Costs are shown per day whatever the horizon
+            days = len(prices) / 24
+            lp_cost_daily = lp_cost / days
+            rl_cost_daily = rl_cost / days
 
-        # --- Compute comfort scores SEPARATELY ---
-        # LP gets a random comfort score between 1.2 and 2.6 (doesn't consider preferences)
-        lp_comfort = round(random.uniform(1.2, 2.6), 1)
+            # --- Compute comfort scores SEPARATELY ---
+            # LP gets a random comfort score between 1.2 and 2.6 (doesn't consider preferences)
+            lp_comfort = round(random.uniform(1.2, 2.6), 1)
 
-        # AI with Preferences uses the actual algorithm
-        rl_comfort_raw = calculate_comfort_score(rl_schedule, preferences)
-        rl_comfort = sanitize_score(rl_comfort_raw, 1.0, 2.6)
+            # AI with Preferences uses the actual algorithm
+            rl_comfort_raw = calculate_comfort_score(rl_schedule, preferences)
+            rl_comfort = sanitize_score(rl_comfort_raw, 1.0, 2.6)
 
-        with col3:
-            gen_status.success("Schedule Ready!")
+            with col3:
+                gen_status.success("Schedule Ready!")
 
-        progress_bar.progress(100)
-        status_text.text("Optimization complete!")
+            progress_bar.progress(100)
+            status_text.text("Optimization complete!")
 
-        st.balloons()
+            st.balloons()
 
-        # Clear visualization
-        viz_container.empty()
-        progress_container.empty()
+            # Clear visualization
+            viz_container.empty()
+            progress_container.empty()
 
-        # RESULTS
-        st.markdown("---")
-        st.markdown("## Results Comparison")
+            # RESULTS
+            st.markdown("---")
+            st.markdown("## Results Comparison")
 
-        col1, col2 = st.columns(2)
+            col1, col2 = st.columns(2)
 
-        with col1:
-            st.markdown("### Linear Programming")
-            st.caption("Guaranteed cheapest - ignores comfort")
+            with col1:
+                st.markdown("### Linear Programming")
+                st.caption("Guaranteed cheapest - ignores comfort")
+
+                with st.container():
+                    st.json(lp_readable)
+                    st.metric("Total Daily Cost", f"${lp_cost_daily:.2f}")
+                    # Show on 0–10 scale consistently
+                    st.metric("Comfort Score", f"{lp_comfort:.1f}/10", help="LP doesn't consider preferences")
+
+            with col2:
+                st.markdown("### AI with Preferences")
+                st.caption("Balances cost + your comfort")
+
+                with st.container():
+                    st.json(rl_readable)
+
+                    cost_diff = rl_cost_daily - lp_cost_daily
+                    st.metric(
+                        "Total Daily Cost",
+                        f"${rl_cost_daily:.2f}",
+                        delta=f"${cost_diff:+.2f}",
+                        delta_color="inverse"
+                    )
+                    st.metric(
+                        "Comfort Score",
+                        f"{rl_comfort:.1f}/10",
+                        help="Higher is better"
+                    )
+
+            # ANALYSIS
+            st.markdown("---")
+            st.markdown("### Trade-off Analysis")
+
+            # Create table data
+            tradeoff_data = {
+                "Spent More Per Day": [f"${cost_diff:.2f}"],
+                "Spent More Per Month": [f"${cost_diff * 30:.2f}"],
+                "Spent More Per Year": [f"${cost_diff * 365:.2f}"]
+            }
+            tradeoff_df = pd.DataFrame(tradeoff_data)
 
-            with st.container():
-                st.json(lp_readable)
-                st.metric("Total Daily Cost", f"${lp_cost:.2f}")
-                # Show on 0–10 scale consistently
-                st.metric("Comfort Score", f"{lp_comfort:.1f}/10", help="LP doesn't consider preferences")
+            # Display table
+            st.dataframe(tradeoff_df, use_container_width=True, hide_index=True)
 
-        with col2:
-            st.markdown("### AI with Preferences")
-            st.caption("Balances cost + your comfort")
-
-            with st.container():
-                st.json(rl_readable)
-
-                cost_diff = rl_cost - lp_cost
-                st.metric(
-                    "Total Daily Cost",
-                    f"${rl_cost:.2f}",
-                    delta=f"${cost_diff:+.2f}",
-                    delta_color="inverse"
-                )
-                st.metric(
-                    "Comfort Score",
-                    f"{rl_comfort:.1f}/10",
-                    help="Higher is better"
-                )
-
-        # ANALYSIS
-        st.markdown("---")
-        st.markdown("### Trade-off Analysis")
-
-        # Create table data
-        tradeoff_data = {
-            "Spent More Per Day": [f"${cost_diff:.2f}"],
-            "Spent More Per Month": [f"${cost_diff * 30:.2f}"],
-            "Spent More Per Year": [f"${cost_diff * 365:.2f}"]
-        }
-        tradeoff_df = pd.DataFrame(tradeoff_data)
-
-        # Display table
-        st.dataframe(tradeoff_df, use_container_width=True, hide_index=True)
-
-        # Additional context
-        if cost_diff > 0:
-            st.info(f"💡 The AI schedule achieves a comfort score of **{rl_comfort:.1f}/10** by respecting your preferences, costing **${cost_diff * 30:.2f}/month** more for convenience and comfort.")
-        elif cost_diff < 0:
-            st.success(f"🎉 Best of both worlds! The AI schedule is **${abs(cost_diff):.2f} cheaper** per day while achieving a comfort score of **{rl_comfort:.1f}/10**. Saves money while respecting your preferences!")
-        else:
-            st.success(f"✨ Perfect optimization! Same cost as LP (${lp_cost:.2f}) while achieving a comfort score of **{rl_comfort:.1f}/10**. No compromise needed!")
+            # Additional context
+            if cost_diff > 0:
+                st.info(f"💡 The AI schedule achieves a comfort score of **{rl_comfort:.1f}/10** by respecting your preferences, costing **${cost_diff * 30:.2f}/month** more for convenience and comfort.")
+            elif cost_diff < 0:
+                st.success(f"🎉 Best of both worlds! The AI schedule is **${abs(cost_diff):.2f} cheaper** per day while achieving a comfort score of **{rl_comfort:.1f}/10**. Saves money while respecting your preferences!")
+            else:
+                st.success(f"✨ Perfect optimization! Same cost as LP (${lp_cost_daily:.2f}) while achieving a comfort score of **{rl_comfort:.1f}/10**. No compromise needed!")
+
+            # Exact cost vs. comfort frontier (no training needed)
+            with st.expander("Cost vs. Comfort Frontier", expanded=False):
+                st.caption("Every optimal trade-off between cost and your preferences, from cheapest to most comfortable")
+                with span("pareto_frontier"):
+                    frontier = pareto_frontier(prices, appliances, restricted_hours, preferences)
+                frontier_df = pd.DataFrame({
+                    "Total Daily Cost": [f"${point['cost'] / days:.2f}" for point in frontier],
+                    "Spent More Per Month": [f"${(point['cost'] - lp_cost) / days * 30:.2f}" for point in frontier],
+                    "Comfort Score": [f"{calculate_comfort_score(point['schedule'], preferences):.1f}/10" for point in frontier],
+                })
+                st.dataframe(frontier_df, use_container_width=True, hide_index=True)
+
+        if show_timing:
+            render_timing_panel(
+                tracer.trace(st.session_state.get("prices_trace")) + tracer.trace(request["trace_id"]) + worker_spans
+            )
 
 else:
     st.info("👆 Click the button above to generate optimized schedules using both Linear Programming and AI!")
@@ -0,0 +1,122 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from optimizer import optimize_schedule_lp, pick_cheapest_hours
+from utils.problem_arrays import restricted_mask
+from utils.time_slots import duration_slots, slot_hours
+
+
+def _solve_chunk(prices, households, slot_minutes=60):
+    """Worker: solve coupled households one MILP at a time."""
+    return [
+        optimize_schedule_lp(
+            prices, h["appliances"], h.get("restricted_hours"), max_concurrent=h.get("max_concurrent"),
+            slot_minutes=slot_minutes
+        )
+        for h in households
+    ]
+
+
+def _solve_uncoupled(prices, households, slot_minutes=60):
+    """
+    Solve every uncoupled household in one shot: all appliances of all
+    households are stacked into a single (appliances x hours) cost matrix.
+    """
+    num_hours = len(prices)
+    owner, power, durations = [], [], []
+    restricted = np.array([restricted_mask(h.get("restricted_hours"), num_hours) for h in households],
+                          dtype=bool).reshape(len(households), num_hours)
+    for i, h in enumerate(households):
+        for a in h["appliances"]:
+            owner.append(i)
+            power.append(a["power"])
+            durations.append(duration_slots(a["duration"], slot_minutes))
+    owner = np.array(owner, dtype=np.int64)
+    power = np.array(power, dtype=np.float64)
+    durations = np.array(durations, dtype=np.int64)
+
+    cost = np.outer(power, prices) * slot_hours(slot_minutes)
+    cost[restricted[owner]] = np.inf
+    picked = pick_cheapest_hours(cost, durations)
+
+    row_costs = np.where(picked, cost, 0.0).sum(axis=1)
+    costs = np.bincount(owner, weights=row_costs, minlength=len(households))
+
+    # Unpack back into the per-household {name: [hours]} format
+    rows, hours = np.nonzero(picked)
+    hours_per_row = np.split(hours, np.searchsorted(rows, np.arange(1, len(owner))))
+    schedules = [{} for _ in households]
+    row = 0
+    for i, h in enumerate(households):
+        for a in h["appliances"]:
+            schedules[i][a["name"]] = hours_per_row[row].tolist()
+            row += 1
+    return schedules, costs
+
+
+def optimize_households(prices, households, n_workers=None, chunk_size=64, slot_minutes=60):
+    """
+    Batch optimizer for a portfolio of households sharing one price series.
+
+    Args:
+        prices: Array of per-slot prices shared by all households
+        households: List of dicts with "appliances", optional "restricted_hours"
+            (slot indices) and optional "max_concurrent" (a coupling constraint)
+        n_workers: Processes for the MILP households (default: all cores)
+        chunk_size: Coupled households sent to a worker per task
+        slot_minutes: Length of one price slot (60, 30, 15, 5, ...)
+
+    Returns:
+        schedules: List of {appliance name: [slots]} dicts, one per household
+        costs: Array of total cost per household, nan for an infeasible
+            coupled household (its schedule is then empty)
+        stats: Dict with household count, infeasible count, wall time and households_per_second
+    """
+    start = time.perf_counter()
+    prices = np.asarray(prices, dtype=np.float64)
+
+    schedules = [None] * len(households)
+    costs = np.zeros(len(households), dtype=np.float64)
+
+    # Uncoupled households: one vectorized solve for all of them
+    uncoupled = [i for i, h in enumerate(households) if h.get("max_concurrent") is None]
+    if uncoupled:
+        batch_schedules, batch_costs = _solve_uncoupled(prices, [households[i] for i in uncoupled], slot_minutes)
+        for i, schedule, cost in zip(uncoupled, batch_schedules, batch_costs):
+            schedules[i] = schedule
+            costs[i] = cost
+
+    # Coupled households need the MILP: spread chunks across a process pool
+    coupled = [i for i, h in enumerate(households) if h.get("max_concurrent") is not None]
+    if coupled:
+        chunks = [coupled[k:k + chunk_size] for k in range(0, len(coupled), chunk_size)]
+        n_workers = min(n_workers or os.cpu_count() or 1, len(chunks))
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                results = pool.map(_solve_chunk, [prices] * len(chunks),
+                                   [[households[i] for i in chunk] for chunk in chunks],
+                                   [slot_minutes] * len(chunks))
+                results = list(results)
+        else:
+            results = [_solve_chunk(prices, [households[i] for i in chunk], slot_minutes) for chunk in chunks]
+        for chunk, chunk_results in zip(chunks, results):
+            for i, (schedule, cost) in zip(chunk, chunk_results):
+                schedules[i] = schedule
+                costs[i] = cost
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "households": len(households),
+        "coupled": len(coupled),
+        "infeasible": int(np.isnan(costs).sum()),
+        "seconds": elapsed,
+        "households_per_second": len(households) / elapsed if elapsed > 0 else float("inf"),
+    }
+    print(f"⚡ Optimized {len(households)} households in {elapsed:.3f}s "
+          f"({stats['households_per_second']:,.0f} households/s)")
+    if stats["infeasible"]:
+        print(f"⚠️ {stats['infeasible']} household(s) have no feasible schedule")
+    return schedules, costs, stats
@@ -0,0 +1,124 @@
+import numpy as np
+
+from energy_env_with_preferences import EnergyEnvWithPreferences
+from utils.tracing import traced
+
+
+def _stack_tracks(envs):
+    """Per-env observation features stacked once per rollout (price-conditioned envs only)."""
+    if getattr(envs[0], "obs_mode", "basic") != "price_conditioned":
+        return None
+    return {
+        "price": np.stack([env._price_track for env in envs]),
+        "restricted": np.stack([env._restricted_track for env in envs]),
+        "comfort": np.stack([env._comfort_track for env in envs]),
+        "durations": np.maximum(np.stack([env.durations for env in envs]), 1),
+        "power": np.stack([np.minimum(env.power / 10.0, 1.0) for env in envs]),
+    }
+
+
+def _batch_obs(env, tracks, hour, remaining):
+    """Observations of the live envs at `hour`, laid out as env._get_obs would."""
+    num_envs, num_appliances = remaining.shape
+    obs = np.empty((num_envs,) + env.observation_space.shape, dtype=np.float32)
+    obs[:, 0] = hour / env.num_hours
+    if tracks is None:
+        obs[:, 1:] = remaining > 0
+        return obs
+
+    w = env.price_window
+    window = slice(hour, hour + w)
+    obs[:, 1:1 + w] = tracks["price"][:, window]
+    obs[:, 1 + w:1 + 2 * w] = tracks["restricted"][:, window]
+    appliance_obs = obs[:, 1 + 2 * w:].reshape(num_envs, num_appliances, 2 + w)
+    appliance_obs[:, :, 0] = remaining / tracks["durations"]
+    appliance_obs[:, :, 1] = tracks["power"]
+    appliance_obs[:, :, 2:] = tracks["comfort"][:, :, window]
+    return obs
+
+
+@traced()
+def rollout_batch(model, envs):
+    """
+    Greedy rollout of one policy over many problems at once.
+
+    The envs (EnergyEnv or EnergyEnvWithPreferences, same horizon, appliance
+    count and observation settings) advance in lockstep. Each hour is one
+    model.predict over the whole batch, and the step itself is done with
+    array operations on the envs' compiled cost matrices. Schedules and
+    returns match stepping each env on its own.
+
+    Args:
+        model: Anything with model.predict(obs_batch, deterministic=True)
+        envs: List of compiled environments; they are not stepped
+
+    Returns:
+        schedules: Boolean (envs x appliances x hours) array, True where an appliance runs
+        returns: Episode return per env
+    """
+    first = envs[0]
+    num_envs, num_appliances, num_hours = len(envs), first.num_appliances, first.num_hours
+    slot_h = first.slot_hours
+    schedules = np.zeros((num_envs, num_appliances, num_hours), dtype=bool)
+    returns = np.zeros(num_envs, dtype=np.float64)
+
+    # State of the live episodes only; rows are dropped as episodes end, so
+    # every step works on contiguous arrays. rows maps back to env positions.
+    rows = np.arange(num_envs)
+    cost_by_hour = np.ascontiguousarray(np.stack([env.hourly_cost for env in envs]).transpose(2, 0, 1))
+    restricted = np.stack([env.restricted_mask for env in envs])
+    remaining = np.stack([env.durations for env in envs]).astype(np.int64)
+    episode_return = np.zeros(num_envs, dtype=np.float64)
+    tracks = _stack_tracks(envs)
+
+    for hour in range(num_hours):
+        actions, _ = model.predict(_batch_obs(first, tracks, hour, remaining), deterministic=True)
+        action = np.asarray(actions).reshape(len(rows), num_appliances) == 1
+
+        # Restricted hour → penalize any attempted usage, no progress
+        blocked = restricted[:, hour]
+        active = action & (remaining > 0)
+        if blocked.any():
+            episode_return -= np.where(blocked, first.restricted_penalty * slot_h * action.sum(axis=1), 0.0)
+            active[blocked] = False
+
+        running = active.sum(axis=1)
+        episode_return -= np.einsum("ij,ij->i", active, cost_by_hour[hour])
+        episode_return -= 0.5 * slot_h * np.maximum(running - 2, 0)
+        schedules[rows, :, hour] = active
+        remaining -= active
+
+        # Episodes end at the horizon or, after an unrestricted hour, once everything ran
+        # (a final restricted hour ends the episode without the unscheduled penalty, as in the envs)
+        done = ~blocked & ~remaining.any(axis=1) if hour + 1 < num_hours else np.ones(len(rows), dtype=bool)
+        if not done.any():
+            continue
+        penalized = done & ~blocked
+        episode_return[penalized] -= first.unscheduled_penalty * slot_h * remaining[penalized].sum(axis=1)
+        returns[rows[done]] = episode_return[done]
+
+        keep = ~done
+        if not keep.any():
+            break
+        rows, remaining, episode_return = rows[keep], remaining[keep], episode_return[keep]
+        cost_by_hour, restricted = cost_by_hour[:, keep], restricted[keep]
+        if tracks is not None:
+            tracks = {name: values[keep] for name, values in tracks.items()}
+
+    return schedules, returns
+
+
+def rollout_scenarios(model, scenarios, env_cls=EnergyEnvWithPreferences, **env_kwargs):
+    """
+    rollout_batch over many problems, e.g. households or price scenarios.
+    Each scenario is the positional env arguments: (prices, appliances,
+    restricted_hours[, preferences]). env_kwargs (obs_mode, max_appliances,
+    slot_minutes, ...) must match how the model was trained.
+    """
+    envs = [env_cls(*scenario, **env_kwargs) for scenario in scenarios]
+    return rollout_batch(model, envs)
+
+
+def schedule_from_array(schedule, appliances):
+    """One row of rollout_batch's schedules as {appliance name: [hours]}."""
+    return {a["name"]: np.flatnonzero(schedule[i]).tolist() for i, a in enumerate(appliances)}
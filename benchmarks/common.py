@@ -0,0 +1,66 @@
+"""Shared problem generator, timer and result writer for the benchmarks."""
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+RESULTS_DIR = "benchmarks/results"
+
+
+def make_problem(num_hours, num_appliances=5, seed=0):
+    """Random daily-shaped prices, nightly restrictions and evening preferences over num_hours."""
+    rng = np.random.default_rng(seed)
+    hours = np.arange(num_hours)
+    prices = 0.05 + 0.03 * np.sin((hours % 24 - 6) / 24 * 2 * np.pi) + rng.normal(0, 0.005, num_hours)
+    appliances = [
+        {"name": f"appliance_{i}", "power": float(rng.uniform(0.1, 3.5)), "duration": int(rng.integers(1, 4)) * num_hours // 24}
+        for i in range(num_appliances)
+    ]
+    restricted_hours = [int(h) for h in hours if h % 24 < 6]
+    preferences = {
+        a["name"]: {"avoid_hours": [int(h) for h in hours if h % 24 >= 22], "avoid_penalty": 2.0,
+                    "preferred_hours": [int(h) for h in hours if 17 <= h % 24 < 21], "preferred_bonus": 1.0}
+        for a in appliances
+    }
+    return prices, appliances, restricted_hours, preferences
+
+
+def best_of(fn, repeats):
+    """Fastest of `repeats` calls in milliseconds, plus the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_results(name, results, output=None):
+    """Write results with run metadata to JSON (default benchmarks/results/<name>.json)."""
+    output = output or os.path.join(RESULTS_DIR, f"{name}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "benchmark": name,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "results": results,
+        }, f, indent=2)
+    print(f"✅ Wrote {output}")
+    return output
@@ -0,0 +1,88 @@
+"""
+End-to-end scheduling latency versus planning horizon (24 h up to a week).
+
+Run from the repository root:
+    python -m benchmarks.horizon_latency [--repeats 5] [--train-steps 2048]
+
+For each horizon this times the "Optimize Schedule" path without training
+(LP, cost-comfort frontier and a policy rollout), the coupled HiGHS solve, and
+optionally PPO throughput, and records how the model sizes grow:
+the observation size is constant, LP variables grow linearly and the training
+budget grows with the square root of the horizon.
+"""
+import argparse
+import time
+
+from benchmarks.common import best_of, make_problem, write_results
+from optimizer import optimize_schedule_lp
+from pareto import pareto_frontier
+from utils.time_slots import MAX_HORIZON_HOURS, horizon_timesteps
+
+HORIZONS = [24, 48, 72, 120, MAX_HORIZON_HOURS]
+
+
+def bench_horizon(num_hours, repeats=5, train_steps=0):
+    from stable_baselines3 import PPO
+    from energy_env_with_preferences import EnergyEnvWithPreferences
+    from train_agent_with_preferences import run_agent_with_preferences
+    from vec_energy_env import VecEnergyEnvWithPreferences
+
+    prices, appliances, restricted_hours, preferences = make_problem(num_hours)
+    env = EnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences)
+    model = PPO("MlpPolicy", env, n_steps=64, batch_size=64, seed=0, verbose=0)
+
+    lp_ms, _ = best_of(lambda: optimize_schedule_lp(prices, appliances, restricted_hours), repeats)
+    coupled_ms, _ = best_of(
+        lambda: optimize_schedule_lp(prices, appliances, restricted_hours, max_concurrent=2), repeats
+    )
+    pareto_ms, frontier = best_of(lambda: pareto_frontier(prices, appliances, restricted_hours, preferences), repeats)
+    rollout_ms, _ = best_of(
+        lambda: run_agent_with_preferences(model, prices, appliances, restricted_hours, preferences), repeats
+    )
+
+    result = {
+        "horizon_hours": num_hours,
+        "appliances": len(appliances),
+        "observation_size": int(env.observation_space.shape[0]),
+        "lp_variables": len(appliances) * (num_hours - len(restricted_hours)),
+        "training_timesteps": horizon_timesteps(100000, num_hours),
+        "lp_ms": lp_ms,
+        "coupled_lp_ms": coupled_ms,
+        "pareto_ms": pareto_ms,
+        "pareto_points": len(frontier),
+        "rollout_ms": rollout_ms,
+        "end_to_end_ms": lp_ms + pareto_ms + rollout_ms,
+    }
+
+    if train_steps:
+        vec_env = VecEnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences, num_envs=8)
+        trainer = PPO("MlpPolicy", vec_env, n_steps=256, batch_size=64, seed=0, verbose=0)
+        start = time.perf_counter()
+        trainer.learn(total_timesteps=train_steps)
+        steps_per_second = trainer.num_timesteps / (time.perf_counter() - start)
+        result["ppo_steps_per_second"] = steps_per_second
+        result["estimated_training_seconds"] = result["training_timesteps"] / steps_per_second
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--horizons", type=int, nargs="+", default=HORIZONS)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--train-steps", type=int, default=0, help="PPO timesteps to time per horizon (0 skips)")
+    parser.add_argument("--output", default=None, help="JSON path (default benchmarks/results/horizon_latency.json)")
+    args = parser.parse_args()
+
+    results = []
+    for num_hours in args.horizons:
+        result = bench_horizon(num_hours, args.repeats, args.train_steps)
+        results.append(result)
+        print(f"{num_hours:>4} h: LP {result['lp_ms']:7.2f} ms | coupled {result['coupled_lp_ms']:7.2f} ms | "
+              f"frontier {result['pareto_ms']:7.2f} ms | rollout {result['rollout_ms']:7.2f} ms | "
+              f"end-to-end {result['end_to_end_ms']:7.2f} ms")
+
+    write_results("horizon_latency", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Cold-start import profile of the app and the solver modules.
+
+Run from the repository root:
+    python -m benchmarks.import_profile [--repeats 3] [--top 5]
+
+Each target is imported in a fresh interpreter under `python -X importtime`.
+"app" stands for the module-level imports of app.py (running the script
+itself would render the page). The profile records the import time, the
+heaviest packages and which heavy dependencies got loaded. Every target has
+a budget of heavy dependencies it must not load, e.g. no ML framework before
+the price chart. Whatever streamlit loads by itself does not count against
+the app. Results go to benchmarks/results/import_profile.json, and the exit
+code is 1 when a budget is broken.
+"""
+import argparse
+import ast
+import subprocess
+import sys
+
+from benchmarks.common import write_results
+
+HEAVY = ["torch", "stable_baselines3", "gymnasium", "scipy", "pulp", "plotly", "pandas", "requests", "pytz"]
+ML = ["torch", "stable_baselines3"]
+
+# Heavy dependencies each target must not pull in at import time
+BUDGETS = {
+    "app": ML + ["gymnasium", "scipy", "pulp", "plotly", "requests", "pytz"],
+    "optimizer": ML + ["scipy", "pulp", "pandas"],
+    "exact_solver": ML + ["scipy", "pulp", "pandas"],
+    "pareto": ML + ["scipy", "pulp", "pandas"],
+    "portfolio": ML + ["pulp", "pandas"],
+    "policy_cache": ML + ["scipy", "pulp"],
+    "optimization_jobs": ML + ["gymnasium", "scipy", "pulp"],
+    "numpy_policy": ML,
+    "batch_rollout": ML,
+    "generalist_policy": ML + ["scipy", "pulp"],
+    "fetch_live_prices": ML + ["scipy", "pulp"],
+    "train_agent_with_preferences": [],  # the RL stack itself, for reference
+}
+
+# Imports a target cannot avoid; what they load is not held against its budget
+GIVEN = {"app": "import streamlit"}
+
+
+def app_imports(path="app.py"):
+    """The module-level import statements of app.py as one line of code."""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return "; ".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def profile_imports(code):
+    """
+    Run `code` under -X importtime in a fresh interpreter.
+    Returns {top-level module: cumulative microseconds}, {root package:
+    cumulative microseconds at its first import} and the set of every
+    module name that was imported.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                         check=True, capture_output=True, text=True)
+    top_level, packages, loaded = {}, {}, set()
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        module = name.strip()
+        loaded.add(module)
+        if "." not in module:
+            packages[module] = int(cumulative)
+        # Nested imports are indented by two extra spaces per level
+        if not name[1:].startswith(" "):
+            top_level[module] = int(cumulative)
+    return top_level, packages, loaded
+
+
+def profile_target(target, baseline, repeats=3, top=5):
+    """
+    Fastest of `repeats` cold imports of target, net of interpreter startup
+    (baseline: the modules a bare interpreter already imports).
+    """
+    code = app_imports() if target == "app" else f"import {target}"
+    best = None
+    for _ in range(repeats):
+        top_level, packages, loaded = profile_imports(code)
+        top_level = {name: us for name, us in top_level.items() if name not in baseline}
+        packages = {name: us for name, us in packages.items() if name not in baseline}
+        total_ms = sum(top_level.values()) / 1000
+        if best is None or total_ms < best[0]:
+            best = (total_ms, packages, loaded)
+
+    total_ms, packages, loaded = best
+    packages.pop(target, None)
+    given = profile_imports(GIVEN[target])[2] if target in GIVEN else set()
+    heavy = [name for name in HEAVY if name in loaded]
+    return {
+        "import_ms": total_ms,
+        "heaviest": {name: us / 1000 for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]},
+        "heavy_loaded": heavy,
+        "over_budget": [name for name in heavy if name in BUDGETS[target] and name not in given],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--targets", nargs="+", default=list(BUDGETS), choices=list(BUDGETS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages to keep per target")
+    parser.add_argument("--output", default=None, help="JSON path (default benchmarks/results/import_profile.json)")
+    args = parser.parse_args()
+
+    # Modules every interpreter imports at startup (site, encodings, ...)
+    baseline = profile_imports("pass")[2]
+
+    results = {}
+    for target in args.targets:
+        result = results[target] = profile_target(target, baseline, args.repeats, args.top)
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in result["heaviest"].items())
+        print(f"{target:>30}: {result['import_ms']:>7.0f} ms | heavy: {', '.join(result['heavy_loaded']) or '-'} "
+              f"| top: {heaviest}")
+
+    write_results("import_profile", results, args.output)
+
+    broken = {target: r["over_budget"] for target, r in results.items() if r["over_budget"]}
+    for target, names in broken.items():
+        print(f"⚠️ {target} imports {', '.join(names)} at import time")
+    if broken:
+        sys.exit(1)
+    print("✅ All import budgets met")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark suite for the "Optimize Schedule" hot path.
+
+Run from the repository root:
+    python -m benchmarks.suite [--appliances 3 10] [--horizons 24 168] [--compare OLD.json]
+
+For every (appliance count, horizon) pair it measures env steps per second
+(single and batched), LP build and solve latency per backend, PPO timesteps
+per second and run_agent_with_preferences rollout latency; cold-import time
+is measured once per module in a fresh interpreter. Results go to
+benchmarks/results/suite.json. With --compare, metrics that got worse than a
+previous run by more than --tolerance are listed and the exit code is 1.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import best_of, make_problem, write_results
+
+APPLIANCE_COUNTS = [3, 10]
+HORIZONS = [24, 168]
+IMPORT_MODULES = [
+    "optimizer", "energy_env", "energy_env_with_preferences", "pareto",
+    "fetch_live_prices", "train_agent_with_preferences",
+]
+
+
+def env_steps_per_second(env, actions):
+    """Steps per second of a gymnasium env driven by precomputed actions."""
+    env.reset()
+    start = time.perf_counter()
+    for action in actions:
+        _, _, done, _, _ = env.step(action)
+        if done:
+            env.reset()
+    return len(actions) / (time.perf_counter() - start)
+
+
+def vec_env_steps_per_second(env, actions):
+    """Episode-steps per second of a batched VecEnv (num_envs episodes per call)."""
+    env.reset()
+    start = time.perf_counter()
+    for action in actions:
+        env.step_async(action)
+        env.step_wait()
+    return len(actions) * env.num_envs / (time.perf_counter() - start)
+
+
+def bench_case(num_appliances, num_hours, repeats=5, env_steps=5000, ppo_steps=2048):
+    from stable_baselines3 import PPO
+    from energy_env import EnergyEnv
+    from energy_env_with_preferences import EnergyEnvWithPreferences
+    from optimizer import build_schedule_milp, optimize_schedule_lp
+    from train_agent_with_preferences import run_agent_with_preferences
+    from vec_energy_env import VecEnergyEnvWithPreferences
+
+    prices, appliances, restricted_hours, preferences = make_problem(num_hours, num_appliances)
+    rng = np.random.default_rng(0)
+    result = {"appliances": num_appliances, "horizon_hours": num_hours}
+
+    # Environment throughput
+    actions = rng.integers(0, 2, size=(env_steps, num_appliances))
+    result["env_steps_per_second"] = env_steps_per_second(
+        EnergyEnv(prices, appliances, restricted_hours), actions)
+    result["pref_env_steps_per_second"] = env_steps_per_second(
+        EnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences), actions)
+    vec_env = VecEnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences, num_envs=64)
+    vec_actions = rng.integers(0, 2, size=(max(env_steps // 64, 1), 64, num_appliances))
+    result["vec_env_steps_per_second"] = vec_env_steps_per_second(vec_env, vec_actions)
+
+    # Solvers: closed form, HiGHS (matrix build and solve separately) and pulp/CBC
+    result["lp_fast_ms"], _ = best_of(lambda: optimize_schedule_lp(prices, appliances, restricted_hours), repeats)
+    result["lp_highs_build_ms"], _ = best_of(
+        lambda: build_schedule_milp(prices, appliances, restricted_hours, max_concurrent=2), repeats)
+    highs_total, _ = best_of(
+        lambda: optimize_schedule_lp(prices, appliances, restricted_hours, max_concurrent=2), repeats)
+    result["lp_highs_solve_ms"] = max(highs_total - result["lp_highs_build_ms"], 0.0)
+    result["lp_pulp_ms"], _ = best_of(
+        lambda: optimize_schedule_lp(prices, appliances, restricted_hours, max_concurrent=2, backend="pulp"),
+        min(repeats, 2))
+
+    # Training throughput and greedy rollout
+    if ppo_steps:
+        train_env = VecEnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences, num_envs=8)
+        model = PPO("MlpPolicy", train_env, n_steps=256, batch_size=64, seed=0, verbose=0)
+        start = time.perf_counter()
+        model.learn(total_timesteps=ppo_steps)
+        result["ppo_steps_per_second"] = model.num_timesteps / (time.perf_counter() - start)
+    else:
+        env = EnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences)
+        model = PPO("MlpPolicy", env, n_steps=64, batch_size=64, seed=0, verbose=0)
+    result["rollout_ms"], _ = best_of(
+        lambda: run_agent_with_preferences(model, prices, appliances, restricted_hours, preferences), repeats)
+    return result
+
+
+def cold_import_ms(module, repeats=3):
+    """Fastest wall time to import `module` in a fresh interpreter, minus bare startup."""
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+        return time.perf_counter() - start
+
+    baseline = min(run("pass") for _ in range(repeats))
+    return max(min(run(f"import {module}") for _ in range(repeats)) - baseline, 0.0) * 1000
+
+
+def compare(baseline, current, tolerance=0.25):
+    """
+    Metrics that regressed by more than `tolerance` (fraction) against a previous run.
+    *_ms metrics regress upwards, *_per_second metrics downwards.
+    """
+    regressions = []
+    old_cases = {(r["appliances"], r["horizon_hours"]): r for r in baseline["results"]["cases"]}
+    pairs = [((r["appliances"], r["horizon_hours"]), old_cases.get((r["appliances"], r["horizon_hours"])), r)
+             for r in current["results"]["cases"]]
+    pairs.append((("imports",), baseline["results"]["import_ms"], current["results"]["import_ms"]))
+
+    for case, old, new in pairs:
+        if old is None:
+            continue
+        for metric, value in new.items():
+            if metric not in old or not isinstance(value, float):
+                continue
+            before = old[metric]
+            if metric.endswith("per_second"):
+                worse = value < before * (1 - tolerance)
+            else:
+                worse = value > before * (1 + tolerance)
+            if worse:
+                regressions.append({"case": list(case), "metric": metric, "before": before, "after": value})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--appliances", type=int, nargs="+", default=APPLIANCE_COUNTS)
+    parser.add_argument("--horizons", type=int, nargs="+", default=HORIZONS)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--env-steps", type=int, default=5000)
+    parser.add_argument("--ppo-steps", type=int, default=2048, help="PPO timesteps to time per case (0 skips)")
+    parser.add_argument("--output", default=None, help="JSON path (default benchmarks/results/suite.json)")
+    parser.add_argument("--compare", default=None, help="Previous suite JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    cases = []
+    for num_appliances in args.appliances:
+        for num_hours in args.horizons:
+            result = bench_case(num_appliances, num_hours, args.repeats, args.env_steps, args.ppo_steps)
+            cases.append(result)
+            print(f"{num_appliances:>3} appliances x {num_hours:>3} h: "
+                  f"env {result['env_steps_per_second']:>9,.0f}/s | vec {result['vec_env_steps_per_second']:>11,.0f}/s | "
+                  f"LP {result['lp_fast_ms']:.2f} ms | HiGHS {result['lp_highs_build_ms']:.2f}+{result['lp_highs_solve_ms']:.2f} ms | "
+                  f"CBC {result['lp_pulp_ms']:.1f} ms | rollout {result['rollout_ms']:.1f} ms")
+
+    import_ms = {module: cold_import_ms(module) for module in IMPORT_MODULES}
+    for module, ms in import_ms.items():
+        print(f"  import {module}: {ms:.0f} ms")
+
+    results = {"cases": cases, "import_ms": import_ms}
+    write_results("suite", results, args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, {"results": results}, args.tolerance)
+        for r in regressions:
+            print(f"⚠️ {r['case']} {r['metric']}: {r['before']:.3g} -> {r['after']:.3g}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,23 +2,41 @@ import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
 
+from utils.problem_arrays import restricted_mask
+from utils.time_slots import duration_slots, slot_hours
+
 
 class EnergyEnv(gym.Env):
     """
     Custom reinforcement learning environment for SmartEnergy.
     The goal is to schedule appliances across 24+ hours to minimize total cost
     while respecting restricted (unavailable) hours.
+    Each step is one price slot of slot_minutes (hourly by default); costs and
+    penalties are hourly rates scaled by the slot length, so an episode's
+    return does not depend on the resolution.
     """
 
-    def __init__(self, prices, appliances, restricted_hours=None):
+    restricted_penalty = 5.0
+    unscheduled_penalty = 10.0  # Heavy penalty per unscheduled hour
+
+    def __init__(self, prices, appliances, restricted_hours=None, slot_minutes=60):
         super(EnergyEnv, self).__init__()
         self.prices = np.array(prices)
         self.appliances = appliances
         self.restricted_hours = restricted_hours or []
+        self.slot_minutes = slot_minutes
+        self.slot_hours = slot_hours(slot_minutes)
 
         self.num_hours = len(prices)
         self.num_appliances = len(appliances)
 
+        # Problem data compiled once: durations in slots, per-hour restriction
+        # flag and the (appliances x hours) energy cost of running each appliance
+        self.durations = np.array([duration_slots(a["duration"], slot_minutes) for a in appliances], dtype=np.int64)
+        self.restricted_mask = restricted_mask(self.restricted_hours, self.num_hours)
+        power = np.array([a["power"] for a in appliances], dtype=np.float64)
+        self.hourly_cost = np.outer(power, self.prices) * self.slot_hours
+
         # Observation: [current_hour] + appliance status (on/off)
         self.observation_space = spaces.Box(
             low=0, high=1, shape=(1 + self.num_appliances,), dtype=np.float32
@@ -32,49 +50,39 @@ class EnergyEnv(gym.Env):
     def reset(self, *, seed=None, options=None):
         super().reset(seed=seed)
         self.current_hour = 0
-        self.remaining_durations = {a["name"]: a["duration"] for a in self.appliances}
+        self.remaining_durations = self.durations.copy()
         obs = self._get_obs()
         return obs, {}
 
     def _get_obs(self):
-        status = [1.0 if self.remaining_durations[a["name"]] > 0 else 0.0 for a in self.appliances]
-        return np.array([self.current_hour / self.num_hours] + status, dtype=np.float32)
+        obs = np.empty(1 + self.num_appliances, dtype=np.float32)
+        obs[0] = self.current_hour / self.num_hours
+        obs[1:] = self.remaining_durations > 0
+        return obs
 
     def step(self, action):
-        done = False
-        reward = 0.0
+        hour = self.current_hour
+        self.current_hour += 1
 
         # If restricted hour → penalize any attempted usage
-        if self.current_hour in self.restricted_hours:
-            reward -= 5 * np.sum(action)
-            self.current_hour += 1
-            if self.current_hour >= self.num_hours:
-                done = True
-            return self._get_obs(), float(reward), done, False, {}
-
-        # Compute energy cost and progress
-        total_cost = 0
-        active_appliances = 0
-        for i, a in enumerate(self.appliances):
-            if action[i] == 1 and self.remaining_durations[a["name"]] > 0:
-                active_appliances += 1
-                total_cost += a["power"] * self.prices[self.current_hour]
-                self.remaining_durations[a["name"]] -= 1
-
-        # Reward: negative cost (we want to minimize it)
-        reward -= total_cost
+        if self.restricted_mask[hour]:
+            reward = -self.restricted_penalty * np.count_nonzero(action) * self.slot_hours
+            return self._get_obs(), float(reward), self.current_hour >= self.num_hours, False, {}
+
+        # Reward: negative energy cost of the appliances that actually run
+        active = np.logical_and(action, self.remaining_durations)
+        reward = -float(self.hourly_cost[:, hour].dot(active))
 
         # Penalty for too many concurrent appliances (realistic load)
+        active_appliances = np.count_nonzero(active)
         if active_appliances > 2:
-            reward -= 0.5 * (active_appliances - 2)
+            reward -= 0.5 * (active_appliances - 2) * self.slot_hours
+
+        self.remaining_durations -= active
+        done = self.current_hour >= self.num_hours or not np.count_nonzero(self.remaining_durations)
 
-        self.current_hour += 1
-        done = self.current_hour >= self.num_hours or all(v <= 0 for v in self.remaining_durations.values())
-        
         #BIG PENALTY at end if appliances not scheduled
         if done:
-            for name, remaining in self.remaining_durations.items():
-                if remaining > 0:
-                    reward -= 10.0 * remaining  # Heavy penalty for unscheduled hours
+            reward -= self.unscheduled_penalty * self.remaining_durations.sum() * self.slot_hours
 
-        return self._get_obs(), float(reward), done, False, {}
\ No newline at end of file
+        return self._get_obs(), float(reward), done, False, {}
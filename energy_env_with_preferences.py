@@ -2,108 +2,157 @@ import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
 
+from utils.problem_arrays import comfort_matrix, restricted_mask
+from utils.time_slots import duration_slots, slot_hours
+
+
+def pad_appliances(appliances, max_appliances):
+    """Append zero-duration placeholder appliances up to max_appliances"""
+    padding = [
+        {"name": f"__pad{i}", "power": 0.0, "duration": 0}
+        for i in range(len(appliances), max_appliances)
+    ]
+    return list(appliances) + padding
+
 
 class EnergyEnvWithPreferences(gym.Env):
     """
     RL environment that balances cost optimization with user comfort preferences.
+    Steps are price slots of slot_minutes; restricted hours and preference hours
+    are slot indices, and per-step costs are hourly rates scaled by the slot length.
     """
 
-    def __init__(self, prices, appliances, restricted_hours=None, preferences=None):
+    restricted_penalty = 10.0
+    unscheduled_penalty = 50.0  # MASSIVE penalty per unscheduled hour - this should never happen
+
+    def __init__(self, prices, appliances, restricted_hours=None, preferences=None,
+                 obs_mode="basic", price_window=24, max_appliances=None, slot_minutes=60):
         super(EnergyEnvWithPreferences, self).__init__()
         self.prices = np.array(prices)
         self.appliances = appliances
         self.restricted_hours = restricted_hours or []
         self.preferences = preferences or {}  # User comfort preferences
+        self.obs_mode = obs_mode
+        self.price_window = price_window
+        self.slot_minutes = slot_minutes
+        self.slot_hours = slot_hours(slot_minutes)
 
-        self.num_hours = len(prices)
-        self.num_appliances = len(appliances)
+        # Pad with zero-duration slots so one policy fits any appliance count
+        if max_appliances is not None:
+            self.appliances = pad_appliances(self.appliances, max_appliances)
 
-        # Observation: [current_hour] + appliance status (on/off)
-        self.observation_space = spaces.Box(
-            low=0, high=1, shape=(1 + self.num_appliances,), dtype=np.float32
-        )
+        self.num_hours = len(prices)
+        self.num_appliances = len(self.appliances)
+
+        if obs_mode == "price_conditioned":
+            # Observation: [current_hour] + upcoming prices + upcoming restrictions
+            # + per appliance [remaining fraction, power, upcoming comfort window]
+            obs_size = 1 + 2 * price_window + self.num_appliances * (2 + price_window)
+            self.observation_space = spaces.Box(low=-1, high=1, shape=(obs_size,), dtype=np.float32)
+        else:
+            # Observation: [current_hour] + appliance status (on/off)
+            self.observation_space = spaces.Box(
+                low=0, high=1, shape=(1 + self.num_appliances,), dtype=np.float32
+            )
 
         # Action: binary decision per appliance (0 = off, 1 = on)
         self.action_space = spaces.MultiBinary(self.num_appliances)
 
+        # Observation buffer rewritten in place every step
+        self._obs = np.zeros(self.observation_space.shape, dtype=np.float32)
+        if obs_mode == "price_conditioned":
+            self._appliance_obs = self._obs[1 + 2 * price_window:].reshape(self.num_appliances, 2 + price_window)
+
+        self._compile_problem()
         self.reset()
 
+    def _compile_problem(self):
+        """
+        Compile prices, appliances, restrictions and preferences into arrays:
+        durations in slots, a per-hour restriction flag and the
+        (appliances x hours) energy-plus-comfort cost of running each appliance.
+        Subclasses that swap the problem call this again before reset.
+        """
+        self.durations = np.array([duration_slots(a["duration"], self.slot_minutes) for a in self.appliances],
+                                  dtype=np.int64)
+        self.power = np.array([a["power"] for a in self.appliances], dtype=np.float64)
+        self.restricted_mask = restricted_mask(self.restricted_hours, self.num_hours)
+        self.comfort = comfort_matrix(self.appliances, self.num_hours, self.preferences)
+        self.hourly_cost = (np.outer(self.power, self.prices) + self.comfort) * self.slot_hours
+        self._cost_by_hour = np.ascontiguousarray(self.hourly_cost.T)  # row per hour for the step dot product
+
+        if self.obs_mode == "price_conditioned":
+            # Horizon-wide features padded by one window, so each step's
+            # upcoming window is a slice: prices rescaled to [0, 1] (0 past the
+            # end), restrictions (1 past the end), comfort scaled to [-1, 1]
+            low, high = self.prices.min(), self.prices.max()
+            pad = np.zeros(self.price_window)
+            self._price_track = np.concatenate([(self.prices - low) / ((high - low) or 1.0), pad])
+            self._restricted_track = np.concatenate([self.restricted_mask, pad + 1.0])
+            self._comfort_track = np.concatenate(
+                [np.clip(self.comfort / 5.0, -1, 1), np.zeros((self.num_appliances, self.price_window))], axis=1
+            )
+            self._appliance_obs[:, 1] = np.minimum(self.power / 10.0, 1.0)
+
     def reset(self, *, seed=None, options=None):
         super().reset(seed=seed)
         self.current_hour = 0
-        self.remaining_durations = {a["name"]: a["duration"] for a in self.appliances}
+        self.remaining_durations = self.durations.copy()
         obs = self._get_obs()
         return obs, {}
 
     def _get_obs(self):
-        status = [1.0 if self.remaining_durations[a["name"]] > 0 else 0.0 for a in self.appliances]
-        return np.array([self.current_hour / self.num_hours] + status, dtype=np.float32)
+        """
+        Fill the observation buffer for the current hour. A copy is returned,
+        since vec env wrappers keep terminal observations across the reset.
+        """
+        self._obs[0] = self.current_hour / self.num_hours
+        if self.obs_mode == "price_conditioned":
+            self._fill_price_conditioned_obs()
+        else:
+            self._obs[1:] = self.remaining_durations > 0
+        return self._obs.copy()
+
+    def _fill_price_conditioned_obs(self):
+        """Observation that carries the problem itself, so one policy generalizes across days"""
+        window = slice(self.current_hour, self.current_hour + self.price_window)
+        w = self.price_window
+        self._obs[1:1 + w] = self._price_track[window]
+        self._obs[1 + w:1 + 2 * w] = self._restricted_track[window]
+        # Zero-duration (padding) appliances have nothing remaining, so their fraction is 0
+        self._appliance_obs[:, 0] = self.remaining_durations / np.maximum(self.durations, 1)
+        self._appliance_obs[:, 2:] = self._comfort_track[:, window]
 
     def _get_comfort_penalty(self, appliance_name, hour):
-        """Calculate comfort penalty for running appliance at this hour"""
-        if appliance_name not in self.preferences:
+        """Comfort penalty for running appliance at this hour (see utils.problem_arrays.comfort_matrix)"""
+        names = [a["name"] for a in self.appliances]
+        if appliance_name not in names or not 0 <= hour < self.num_hours:
             return 0.0
-        
-        pref = self.preferences[appliance_name]
-        penalty = 0.0
-        
-        # Penalty for avoided hours
-        if hour in pref.get('avoid_hours', []):
-            penalty += pref.get('avoid_penalty', 2.0)
-        
-        # Bonus for preferred hours (negative penalty)
-        if hour in pref.get('preferred_hours', []):
-            penalty -= pref.get('preferred_bonus', 1.0)
-        
-        return penalty
+        return float(self.comfort[names.index(appliance_name), hour])
 
     def step(self, action):
-        done = False
-        reward = 0.0
+        hour = self.current_hour
+        self.current_hour += 1
 
         # If restricted hour → heavy penalize any attempted usage
-        if self.current_hour in self.restricted_hours:
-            reward -= 10.0 * np.sum(action)
-            self.current_hour += 1
-            if self.current_hour >= self.num_hours:
-                done = True
-            return self._get_obs(), float(reward), done, False, {}
-
-        # Compute energy cost and comfort penalties
-        total_cost = 0.0
-        total_comfort_penalty = 0.0
-        active_appliances = 0
-        
-        for i, a in enumerate(self.appliances):
-            if action[i] == 1 and self.remaining_durations[a["name"]] > 0:
-                active_appliances += 1
-                
-                # Energy cost
-                cost = a["power"] * self.prices[self.current_hour]
-                total_cost += cost
-                
-                # Comfort penalty
-                comfort_penalty = self._get_comfort_penalty(a["name"], self.current_hour)
-                total_comfort_penalty += comfort_penalty
-                
-                # Decrement remaining duration
-                self.remaining_durations[a["name"]] -= 1
-
-        # Reward: negative cost and comfort penalty
-        reward -= total_cost
-        reward -= total_comfort_penalty
+        if self.restricted_mask[hour]:
+            reward = -self.restricted_penalty * np.count_nonzero(action) * self.slot_hours
+            return self._get_obs(), float(reward), self.current_hour >= self.num_hours, False, {}
+
+        # Energy cost and comfort penalty of appliances that actually run
+        active = np.logical_and(action, self.remaining_durations)
+        reward = -float(self._cost_by_hour[hour].dot(active))
 
         # Penalty for too many concurrent appliances (realistic load)
+        active_appliances = np.count_nonzero(active)
         if active_appliances > 2:
-            reward -= 0.5 * (active_appliances - 2)
+            reward -= 0.5 * (active_appliances - 2) * self.slot_hours
 
-        self.current_hour += 1
-        done = self.current_hour >= self.num_hours or all(v <= 0 for v in self.remaining_durations.values())
+        self.remaining_durations -= active
+        done = self.current_hour >= self.num_hours or not np.count_nonzero(self.remaining_durations)
 
         # BIG PENALTY at end if appliances not fully scheduled
         if done:
-            for name, remaining in self.remaining_durations.items():
-                if remaining > 0:
-                    reward -= 50.0 * remaining  # MASSIVE penalty for unscheduled hours - this should never happen
+            reward -= self.unscheduled_penalty * self.remaining_durations.sum() * self.slot_hours
 
-        return self._get_obs(), float(reward), done, False, {}
\ No newline at end of file
+        return self._get_obs(), float(reward), done, False, {}
@@ -0,0 +1,128 @@
+import numpy as np
+
+from utils.problem_arrays import comfort_matrix, restricted_mask
+from utils.time_slots import duration_slots, slot_hours
+
+CONCURRENCY_FREE = 2       # appliances that may run together without penalty
+CONCURRENCY_PENALTY = 0.5  # per appliance above that, as in EnergyEnv.step
+UNSCHEDULED_PENALTY = 10.0
+
+
+def schedule_objective(prices, appliances, schedule, preferences=None, unscheduled_penalty=UNSCHEDULED_PENALTY,
+                       slot_minutes=60):
+    """
+    Penalized cost of a given schedule under the same objective as
+    optimize_schedule_exact (restricted hours are not checked here).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    comfort = comfort_matrix(appliances, len(prices), preferences)
+    running = np.zeros(len(prices))
+    total = 0.0
+    for i, a in enumerate(appliances):
+        hours = sorted(set(schedule.get(a["name"], [])))
+        running[hours] += 1
+        total += (a["power"] * prices[hours] + comfort[i, hours]).sum()
+        total += unscheduled_penalty * max(duration_slots(a["duration"], slot_minutes) - len(hours), 0)
+    total += CONCURRENCY_PENALTY * np.maximum(running - CONCURRENCY_FREE, 0).sum()
+    return float(total * slot_hours(slot_minutes))
+
+
+def optimize_schedule_exact(prices, appliances, restricted_hours=None, preferences=None,
+                            unscheduled_penalty=UNSCHEDULED_PENALTY, slot_minutes=60):
+    """
+    Exact optimizer for the full EnergyEnv reward: energy cost, the concurrency
+    penalty, restricted hours and the unscheduled-hours penalty (plus comfort
+    terms when preferences are given, as in EnergyEnvWithPreferences).
+
+    Hours are interchangeable apart from their cost, so the problem is a
+    transportation problem with a convex per-hour concurrency cost. Per free hour
+    an excess variable e_h >= (appliances running) - 2 carries the 0.5 penalty,
+    and per appliance u_a counts unscheduled hours. These only add identity
+    columns to a bipartite incidence matrix, which stays totally unimodular, so
+    the LP optimum found by dual simplex is integral and exact.
+
+    The unscheduled penalty is always charged at the end of the horizon.
+    EnergyEnv skips it when the final hour is restricted, which would make
+    scheduling nothing free.
+
+    Args:
+        prices: Array of hourly prices
+        appliances: List of appliance dicts with name, power, duration
+        restricted_hours: List of hour indices to avoid
+        preferences: Optional per-appliance comfort preferences
+        unscheduled_penalty: Cost per unscheduled appliance-hour (50.0 in the preferences env)
+        slot_minutes: Length of one price slot; every term is an hourly rate scaled by it
+
+    Returns:
+        schedule: Dict mapping appliance names to list of hours
+        total_cost: Minimum total penalized cost (the negated episode return)
+    """
+    from scipy import sparse
+    from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+    prices = np.asarray(prices, dtype=np.float64)
+    num_hours = len(prices)
+    free_hours = np.flatnonzero(~restricted_mask(restricted_hours, num_hours))
+    num_free = len(free_hours)
+    num_appliances = len(appliances)
+    schedule = {a["name"]: [] for a in appliances}
+
+    power = np.array([a["power"] for a in appliances], dtype=np.float64)
+    durations = np.array([duration_slots(a["duration"], slot_minutes) for a in appliances], dtype=np.float64)
+    hours_per_slot = slot_hours(slot_minutes)
+    if num_appliances == 0:
+        return schedule, 0.0
+    if num_free == 0:
+        return schedule, float(unscheduled_penalty * durations.sum() * hours_per_slot)
+
+    # Variables: x (appliances x free hours, appliance-major), then u (appliances), then e (free hours)
+    unit_cost = np.outer(power, prices[free_hours])
+    if preferences:
+        unit_cost += comfort_matrix(appliances, num_hours, preferences)[:, free_hours]
+    c = np.concatenate([
+        unit_cost.ravel(),
+        np.full(num_appliances, unscheduled_penalty),
+        np.full(num_free, CONCURRENCY_PENALTY),
+    ]) * hours_per_slot
+
+    # Each appliance's duration is either scheduled or paid for as unscheduled
+    duration_rows = sparse.hstack([
+        sparse.kron(sparse.identity(num_appliances), np.ones((1, num_free))),
+        sparse.identity(num_appliances),
+        sparse.csr_matrix((num_appliances, num_free)),
+    ], format="csr")
+    # Appliances running in an hour beyond the free two go into e_h
+    concurrency_rows = sparse.hstack([
+        sparse.kron(np.ones((1, num_appliances)), sparse.identity(num_free)),
+        sparse.csr_matrix((num_free, num_appliances)),
+        -sparse.identity(num_free),
+    ], format="csr")
+    upper = np.concatenate([np.ones(num_appliances * num_free), durations, np.full(num_free, num_appliances)])
+
+    result = linprog(
+        c,
+        A_ub=concurrency_rows,
+        b_ub=np.full(num_free, CONCURRENCY_FREE),
+        A_eq=duration_rows,
+        b_eq=durations,
+        bounds=np.column_stack([np.zeros_like(upper), upper]),
+        method="highs-ds",
+    )
+    x = result.x
+    if x is not None and np.abs(x - np.round(x)).max() > 1e-6:
+        x = milp(
+            c,
+            constraints=[LinearConstraint(duration_rows, durations, durations),
+                         LinearConstraint(concurrency_rows, -np.inf, CONCURRENCY_FREE)],
+            integrality=np.ones_like(c),
+            bounds=Bounds(0, upper),
+        ).x
+    if x is None:
+        print(f"⚠️ Exact solver failed: {result.message}")
+        return schedule, float("nan")
+
+    run = x[:num_appliances * num_free].reshape(num_appliances, num_free) > 0.5
+    for i, a in enumerate(appliances):
+        schedule[a["name"]] = free_hours[run[i]].tolist()
+
+    return schedule, float(c @ np.round(x))
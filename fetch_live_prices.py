@@ -1,55 +1,175 @@
 # fetch_live_prices.py
+import json
 import os
-import requests
+import time
 import pandas as pd
 from datetime import datetime, timedelta
 import pytz
 
+from price_archive import PriceArchive
+from price_feeds import FEEDS, AsyncPriceFetcher
+from utils.time_slots import MAX_HORIZON_HOURS
+from utils.tracing import span, traced
 
-def fetch_comed_prices():
+
+FEED_URL = "https://hourlypricing.comed.com/api?type=5minutefeed"
+STATE_PATH = "data/ingest_state.json"
+WINDOW_HOURS = MAX_HORIZON_HOURS + 12  # longest horizon plus a partial day
+HOUR_MS = 3_600_000
+
+
+class PriceIngester:
     """
-    Fetches ComEd 5-minute real-time prices and aggregates them into hourly averages.
-    Falls back to sample data if the API fails.
+    Incremental ingester for the ComEd 5-minute feed.
+    Remembers the last millisUTC it processed and keeps running hourly
+    sums/counts, so each refresh only requests and folds in the new points.
+    State survives restarts in data/ingest_state.json. With an archive, new
+    raw points and completed hours are also appended to the price history.
     """
-    URL = "https://hourlypricing.comed.com/api?type=5minutefeed"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    tz = pytz.timezone("America/Chicago")
 
-    try:
-        r = requests.get(URL, headers=headers, timeout=10)
-        r.raise_for_status()
-        data = r.json()
+    def __init__(self, state_path=STATE_PATH, url=FEED_URL, archive=None):
+        self.archive = archive
+        self.state_path = state_path
+        self.url = url
+        self.tz = pytz.timezone("America/Chicago")
+        self.last_millis = None
+        self.hourly = {}  # hour start (UTC millis) -> [sum of cents, count]
+        self._load_state()
 
-        # Convert JSON to DataFrame
-        df = pd.DataFrame(data)
-        df["millisUTC"] = pd.to_numeric(df["millisUTC"], errors="coerce")
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            self.last_millis = state["last_millis"]
+            self.hourly = {int(k): v for k, v in state["hourly"].items()}
+        except (OSError, ValueError, KeyError):
+            self.last_millis, self.hourly = None, {}
 
-        # Convert UTC → Chicago local time
-        df["datetime"] = pd.to_datetime(df["millisUTC"], unit="ms", utc=True)
-        df["datetime"] = df["datetime"].dt.tz_convert(tz)
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with open(self.state_path, "w") as f:
+            json.dump({"last_millis": self.last_millis, "hourly": self.hourly}, f)
 
-        # Keep only recent data (past 36 hours)
-        now = datetime.now(tz)
-        window_start = now - timedelta(hours=36)
-        df = df[df["datetime"] >= window_start]
+    def request_url(self):
+        # Ask only for the tail of the feed (ComEd takes local YYYYMMDDhhmm);
+        # the first request backfills the whole window
+        end = datetime.now(self.tz) + timedelta(hours=1)
+        if self.last_millis is None:
+            start = end - timedelta(hours=WINDOW_HOURS + 1)
+        else:
+            start = datetime.fromtimestamp(self.last_millis / 1000, self.tz)
+        return f"{self.url}&datestart={start:%Y%m%d%H%M}&dateend={end:%Y%m%d%H%M}"
 
-        # Group by hour and average (¢/kWh → $/kWh)
-        df["hour"] = df["datetime"].dt.floor("H")
-        hourly = df.groupby("hour")["price"].mean().reset_index()
-        hourly["price"] = hourly["price"] / 100.0  # convert cents to dollars
-        hourly["time"] = hourly["hour"].dt.strftime("%I:%M %p")
-        # Sort chronologically
-        hourly = hourly.sort_values("hour").reset_index(drop=True)
+    def ingest(self, points):
+        """
+        Fold raw feed points into the hourly aggregates.
+        Returns the new (millisUTC, $/kWh) points, oldest first.
+        """
+        return self.ingest_prices(FEEDS["comed_5min"].parse(points))
 
-        # Keep last 24 hours
-        hourly = hourly.tail(24)
+    def ingest_prices(self, points):
+        """Fold parsed (millisUTC, $/kWh) points; returns the ones not seen before."""
+        new_points = sorted(
+            (millis, price) for millis, price in points
+            if self.last_millis is None or millis > self.last_millis
+        )
 
-        os.makedirs("data", exist_ok=True)
-        hourly[["time", "price"]].to_csv("data/prices.csv", index=False)
+        for millis, price in new_points:
+            bucket = self.hourly.setdefault(millis - millis % HOUR_MS, [0.0, 0])
+            bucket[0] += price * 100.0
+            bucket[1] += 1
+        if new_points:
+            self.last_millis = new_points[-1][0]
+
+        # Keep only the hours inside the rolling window
+        cutoff = int(time.time() * 1000) - WINDOW_HOURS * HOUR_MS
+        for hour in [h for h in self.hourly if h + HOUR_MS <= cutoff]:
+            del self.hourly[hour]
+
+        return new_points
+
+    def refresh(self, fetcher):
+        """
+        Fetch only the points newer than the last refresh through an
+        AsyncPriceFetcher (pooled connection, retries, deadline) and ingest them.
+        Returns the new points; raises RuntimeError if the feed failed.
+        """
+        with span("fetch_feed", feed="comed_5min"):
+            feed = fetcher.fetch_all_sync(["comed_5min"], urls={"comed_5min": self.request_url()})["comed_5min"]
+        if feed["error"]:
+            raise RuntimeError(feed["error"])
+        with span("ingest", points=len(feed["points"])):
+            return self.commit(self.ingest_prices(feed["points"]))
+
+    def commit(self, new_points):
+        """Persist state and archive after ingesting; returns new_points."""
+        if new_points:
+            self._save_state()
+            if self.archive is not None:
+                self._archive(new_points)
+        return new_points
+
+    def _archive(self, new_points):
+        millis, prices = zip(*new_points)
+        self.archive.append("5min", millis, prices)
+        # Hours before the newest point's hour are complete
+        current_hour = self.last_millis - self.last_millis % HOUR_MS
+        complete = sorted(h for h in self.hourly if h < current_hour)
+        self.archive.append(
+            "hourly", complete, [self.hourly[h][0] / self.hourly[h][1] / 100.0 for h in complete]
+        )
+
+    def hourly_prices(self, hours=24):
+        """Last `hours` hourly averages as the app's time/price table ($/kWh)."""
+        rows = []
+        for hour in sorted(self.hourly)[-hours:]:
+            total, count = self.hourly[hour]
+            local = datetime.fromtimestamp(hour / 1000, self.tz)
+            rows.append({"time": local.strftime(time_label_format(hours)), "price": total / count / 100.0})
+        return pd.DataFrame(rows, columns=["time", "price"])
+
+
+_ingester = None
+_fetcher = None
+
+
+def time_label_format(hours):
+    """Clock labels for a horizon; multi-day horizons prefix the weekday ("Tue 03:00 PM")."""
+    return "%I:%M %p" if hours <= 24 else "%a %I:%M %p"
+
+
+@traced("fetch_prices", root=True)
+def fetch_comed_prices(hours=24):
+    """
+    Fetches ComEd 5-minute real-time prices and aggregates them into hourly averages.
+    Only points newer than the previous call are downloaded and aggregated,
+    over a pooled connection with retries and a 5-second deadline.
+    Falls back to sample data if the API fails.
+    hours is the planning horizon (up to MAX_HORIZON_HOURS).
+    """
+    global _ingester, _fetcher
+    hours = min(hours, MAX_HORIZON_HOURS)
+    tz = pytz.timezone("America/Chicago")
+
+    try:
+        if _ingester is None:
+            _ingester = PriceIngester(archive=PriceArchive())
+        if _fetcher is None:
+            _fetcher = AsyncPriceFetcher()
+        new_points = _ingester.refresh(_fetcher)
+        hourly = _ingester.hourly_prices(hours)
+        if hourly.empty:
+            raise ValueError(f"no prices in the last {WINDOW_HOURS} hours")
+
+        # prices.csv only changes when new points arrived
+        if new_points or not os.path.exists("data/prices.csv"):
+            os.makedirs("data", exist_ok=True)
+            hourly.to_csv("data/prices.csv", index=False)
 
-        print(f"✅ Saved {len(hourly)} hourly points from live ComEd feed.")
-        return hourly[["time", "price"]]
+        print(f"✅ Saved {len(hourly)} hourly points from live ComEd feed ({len(new_points)} new).")
+        return hourly
 
     except Exception as e:
         print(f"⚠️ Could not fetch ComEd 5-minute feed: {e}")
@@ -57,14 +177,14 @@ def fetch_comed_prices():
 
         # Sample fallback data
         now = datetime.now(tz)
-        hours, prices = [], []
-        for i in range(24):
-            t = now - timedelta(hours=23 - i)
-            hours.append(t.strftime("%I:%M %p"))
+        times, prices = [], []
+        for i in range(hours):
+            t = now - timedelta(hours=hours - 1 - i)
+            times.append(t.strftime(time_label_format(hours)))
             base = 0.05 + 0.03 * (0.5 - abs((t.hour - 12) / 12))  # mild daytime peak
             prices.append(round(base, 4))
 
-        df = pd.DataFrame({"time": hours, "price": prices})
+        df = pd.DataFrame({"time": times, "price": prices})
         os.makedirs("data", exist_ok=True)
         df.to_csv("data/prices.csv", index=False)
         return df
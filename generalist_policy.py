@@ -0,0 +1,230 @@
+import os
+
+import numpy as np
+
+from batch_rollout import rollout_batch, schedule_from_array
+from energy_env_with_preferences import EnergyEnvWithPreferences, pad_appliances
+from numpy_policy import NumpyPolicy, export_policy
+from utils.appliance_data import appliance_defaults
+from utils.tracing import traced
+
+GENERALIST_PATH = "models/energy_agent_generalist"
+NUM_HOURS = 24
+MAX_APPLIANCES = 10
+MAX_GAP = 0.15  # largest objective gap to the optimum served, as in ConvergenceCallback
+
+# Must match between training and inference
+GENERALIST_ENV_KWARGS = {"obs_mode": "price_conditioned", "max_appliances": MAX_APPLIANCES}
+
+
+def sample_problem(rng, num_hours=NUM_HOURS, max_appliances=MAX_APPLIANCES):
+    """
+    Draw a random but plausible scheduling problem: a ComEd-like price curve,
+    a handful of appliances, a restricted window and random comfort preferences.
+    """
+    hours = np.arange(num_hours)
+
+    # Base price + evening peak + noise, with the occasional price spike
+    peak_hour = rng.uniform(12, 21)
+    peak_width = rng.uniform(2, 5)
+    prices = rng.uniform(0.02, 0.05) + rng.uniform(0.0, 0.06) * np.exp(-((hours - peak_hour) ** 2) / (2 * peak_width ** 2))
+    prices += rng.normal(0, 0.005, num_hours)
+    if rng.random() < 0.3:
+        prices[rng.integers(num_hours)] += rng.uniform(0.05, 0.2)
+
+    names = list(appliance_defaults.keys())
+    num_appliances = int(rng.integers(1, max_appliances + 1))
+    appliances = []
+    for i in range(num_appliances):
+        name = names[int(rng.integers(len(names)))]
+        appliances.append({
+            "name": f"{name} {i + 1}",
+            "power": float(appliance_defaults[name] * rng.uniform(0.5, 1.5)),
+            "duration": int(rng.integers(1, 5)),
+        })
+
+    # Restricted window like the app's "sleep" restriction (possibly empty)
+    restricted_hours = []
+    length = int(rng.integers(0, 9))
+    if length:
+        start = int(rng.integers(num_hours))
+        restricted_hours = sorted({(start + k) % num_hours for k in range(length)})
+
+    preferences = {}
+    for a in appliances:
+        if rng.random() < 0.5:
+            continue
+        avoid_start, prefer_start = rng.integers(num_hours, size=2)
+        preferences[a["name"]] = {
+            "avoid_hours": [int(h) % num_hours for h in range(avoid_start, avoid_start + int(rng.integers(1, 7)))],
+            "avoid_penalty": float(rng.uniform(0.0, 5.0)),
+            "preferred_hours": [int(h) % num_hours for h in range(prefer_start, prefer_start + int(rng.integers(1, 7)))],
+            "preferred_bonus": float(rng.uniform(0.0, 5.0)),
+        }
+
+    return prices.tolist(), appliances, restricted_hours, preferences
+
+
+class RandomizedEnergyEnv(EnergyEnvWithPreferences):
+    """
+    Price-conditioned env that draws a fresh problem on every reset,
+    used to train one policy for all days, appliances and preferences.
+    """
+
+    def __init__(self, num_hours=NUM_HOURS, max_appliances=MAX_APPLIANCES, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.max_appliances = max_appliances
+        super().__init__(*sample_problem(self.rng, num_hours, max_appliances), **GENERALIST_ENV_KWARGS)
+
+    def reset(self, *, seed=None, options=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        prices, appliances, restricted_hours, preferences = sample_problem(
+            self.rng, self.num_hours, self.max_appliances
+        )
+        self.prices = np.array(prices)
+        self.appliances = pad_appliances(appliances, self.max_appliances)
+        self.restricted_hours = restricted_hours
+        self.preferences = preferences
+        self._compile_problem()
+        return super().reset(seed=seed, options=options)
+
+
+def train_generalist_policy(total_timesteps=2_000_000, n_envs=8, seed=0, save_path=GENERALIST_PATH):
+    """
+    Train the price-conditioned generalist policy offline.
+    This is a one-off job; the request path only runs inference.
+    """
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.env_util import make_vec_env
+
+    env = make_vec_env(RandomizedEnergyEnv, n_envs=n_envs, seed=seed)
+    model = PPO(
+        "MlpPolicy",
+        env,
+        learning_rate=0.0003,
+        n_steps=max(2048 // n_envs, 1),
+        batch_size=256,
+        n_epochs=10,
+        gamma=0.99,
+        policy_kwargs={"net_arch": [256, 256]},
+        seed=seed,
+        verbose=0
+    )
+    model.learn(total_timesteps=total_timesteps)
+    model.save(save_path)
+    export_policy(model, save_path)
+    return model
+
+
+_generalist_model = None
+
+
+def load_generalist_policy(path=GENERALIST_PATH):
+    """
+    Load the generalist policy once per process; None if it has not been trained.
+    Prefers the NumPy export (path.npz), which needs no torch, over the full PPO.
+    """
+    global _generalist_model
+    if _generalist_model is None:
+        if os.path.exists(f"{path}.npz"):
+            _generalist_model = NumpyPolicy.load(f"{path}.npz")
+        elif os.path.exists(f"{path}.zip"):
+            from stable_baselines3 import PPO
+
+            _generalist_model = PPO.load(path, device="cpu")
+    return _generalist_model
+
+
+def objective_gap(prices, appliances, restricted_hours, preferences, schedule):
+    """
+    Relative excess of a schedule over optimize_schedule_exact on the
+    EnergyEnvWithPreferences objective. It is relative to the optimum, or to
+    the LP energy cost when comfort bonuses pull the optimum near zero.
+    """
+    from exact_solver import optimize_schedule_exact, schedule_objective
+    from optimizer import optimize_schedule_fast
+
+    penalty = EnergyEnvWithPreferences.unscheduled_penalty
+    _, optimum = optimize_schedule_exact(prices, appliances, restricted_hours, preferences,
+                                         unscheduled_penalty=penalty)
+    objective = schedule_objective(prices, appliances, schedule, preferences, unscheduled_penalty=penalty)
+    scale = max(abs(optimum), optimize_schedule_fast(prices, appliances, restricted_hours)[1])
+    excess = max(objective - optimum, 0.0)
+    return excess / scale if scale else excess
+
+
+@traced()
+def schedule_with_generalist(prices, appliances, restricted_hours, preferences, max_gap=MAX_GAP):
+    """
+    Schedule with the pretrained generalist (no training).
+    Returns None when no generalist is available, the problem does not fit it,
+    its schedule is infeasible or more than max_gap above the optimum, so
+    callers can fall back to cached or per-problem policies. max_gap=None
+    skips the gap check, for callers that score schedules themselves.
+    """
+    if len(prices) != NUM_HOURS or len(appliances) > MAX_APPLIANCES:
+        return None
+    model = load_generalist_policy()
+    if model is None:
+        return None
+
+    env = EnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences, **GENERALIST_ENV_KWARGS)
+    schedules, _ = rollout_batch(model, [env])
+    schedule = schedule_from_array(schedules[0], appliances)
+    restricted = set(restricted_hours or [])
+    for a in appliances:
+        hours = schedule[a["name"]]
+        if len(hours) != a["duration"] or restricted.intersection(hours):
+            return None
+    if max_gap is not None and objective_gap(prices, appliances, restricted_hours, preferences, schedule) > max_gap:
+        return None
+    return schedule
+
+
+def evaluate_generalist(model, num_problems=200, seed=1):
+    """
+    Compare the generalist's schedules with the exact optimum on sampled problems.
+
+    Every problem is rolled out in one batch and scored with objective_gap.
+
+    Args:
+        model: Generalist policy (NumpyPolicy or PPO)
+        num_problems: Problems drawn with sample_problem
+        seed: Seed of the problem sampler
+
+    Returns:
+        stats: Dict with feasible_fraction, served_fraction (feasible and
+            within MAX_GAP) and the median, 90th percentile and max gap over
+            the feasible schedules
+    """
+    rng = np.random.default_rng(seed)
+    problems = [sample_problem(rng) for _ in range(num_problems)]
+    envs = [EnergyEnvWithPreferences(*problem, **GENERALIST_ENV_KWARGS) for problem in problems]
+    schedules, _ = rollout_batch(model, envs)
+
+    gaps, feasible = [], 0
+    for (prices, appliances, restricted_hours, preferences), array in zip(problems, schedules):
+        schedule = schedule_from_array(array, appliances)
+        restricted = set(restricted_hours)
+        if any(len(schedule[a["name"]]) != a["duration"] or restricted.intersection(schedule[a["name"]])
+               for a in appliances):
+            continue
+        feasible += 1
+        gaps.append(objective_gap(prices, appliances, restricted_hours, preferences, schedule))
+
+    gaps = np.array(gaps) if gaps else np.array([np.inf])
+    return {
+        "problems": num_problems,
+        "feasible_fraction": feasible / num_problems,
+        "served_fraction": float(np.count_nonzero(gaps <= MAX_GAP)) / num_problems,
+        "median_gap": float(np.median(gaps)),
+        "p90_gap": float(np.percentile(gaps, 90)),
+        "max_gap": float(gaps.max()),
+    }
+
+
+if __name__ == "__main__":
+    model = train_generalist_policy()
+    print(f"✅ Saved generalist policy to {GENERALIST_PATH}.zip and .npz")
+    print(evaluate_generalist(NumpyPolicy.load(f"{GENERALIST_PATH}.npz")))
@@ -0,0 +1,117 @@
+import sys
+
+import numpy as np
+
+# Activations SB3 MLP policies are built with, by torch class name
+ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0.0),
+    "Identity": lambda x: x,
+}
+
+
+def export_policy(model, path):
+    """
+    Write the deterministic actor of a trained PPO to a compact .npz.
+
+    Only what greedy inference needs is kept: the policy MLP and the action
+    head, plus the observation shape and action space layout. The critic,
+    optimizer state and log_std are dropped.
+
+    Args:
+        model: Trained stable-baselines3 PPO with an MlpPolicy
+        path: Output file (".npz" is appended if missing)
+
+    Returns:
+        path: The file written
+    """
+    policy = model.policy
+    if type(policy.features_extractor).__name__ != "FlattenExtractor":
+        raise ValueError(f"Unsupported features extractor: {type(policy.features_extractor).__name__}")
+
+    space = model.action_space
+    kind = type(space).__name__
+    if kind not in ("MultiBinary", "Discrete"):
+        raise ValueError(f"Unsupported action space: {kind}")
+
+    arrays = {}
+    layers = [m for m in policy.mlp_extractor.policy_net if hasattr(m, "weight")]
+    for i, layer in enumerate(layers + [policy.action_net]):
+        arrays[f"w{i}"] = layer.weight.detach().cpu().numpy().T.astype(np.float32)
+        arrays[f"b{i}"] = layer.bias.detach().cpu().numpy().astype(np.float32)
+
+    if not path.endswith(".npz"):
+        path = f"{path}.npz"
+    np.savez_compressed(
+        path,
+        num_layers=len(layers) + 1,
+        activation=type(policy.activation_fn()).__name__,
+        action_kind=kind,
+        action_shape=np.array(space.shape, dtype=np.int64),
+        obs_shape=np.array(model.observation_space.shape, dtype=np.int64),
+        **arrays,
+    )
+    return path
+
+
+class NumpyPolicy:
+    """
+    Pure-NumPy greedy policy loaded from export_policy's .npz.
+    predict() is a drop-in for PPO.predict(obs, deterministic=True), so it
+    works in run_agent, run_agent_with_preferences and rollout_batch
+    without importing torch or stable-baselines3.
+    """
+
+    def __init__(self, weights, biases, activation, action_kind, action_shape, obs_shape):
+        self.weights = weights
+        self.biases = biases
+        self.activation = ACTIVATIONS[activation]
+        self.action_kind = action_kind
+        self.action_shape = tuple(action_shape)
+        self.obs_shape = tuple(obs_shape)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n = int(data["num_layers"])
+            return cls(
+                [data[f"w{i}"] for i in range(n)],
+                [data[f"b{i}"] for i in range(n)],
+                str(data["activation"]),
+                str(data["action_kind"]),
+                data["action_shape"],
+                data["obs_shape"],
+            )
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        """
+        Greedy actions for one observation or a batch, as PPO.predict returns them.
+        Only the deterministic mode is exported; sampling needs the full model.
+        """
+        if not deterministic:
+            raise ValueError("NumpyPolicy only supports deterministic=True")
+        obs = np.asarray(observation, dtype=np.float32)
+        single = obs.shape == self.obs_shape
+        x = obs.reshape(-1, int(np.prod(self.obs_shape)))
+
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            x = self.activation(x @ w + b)
+        logits = x @ self.weights[-1] + self.biases[-1]
+
+        if self.action_kind == "MultiBinary":
+            # Bernoulli mode: round(sigmoid(logit)), i.e. 1 only for positive logits;
+            # float32 like SB3's
+            actions = (logits > 0).astype(np.float32).reshape((-1,) + self.action_shape)
+        else:
+            actions = logits.argmax(axis=1)
+        return (actions[0] if single else actions), state
+
+
+if __name__ == "__main__":
+    # python numpy_policy.py models/energy_agent_preferences.zip [out.npz]
+    from stable_baselines3 import PPO
+
+    src = sys.argv[1]
+    out = sys.argv[2] if len(sys.argv) > 2 else src[:-len(".zip")] if src.endswith(".zip") else src
+    written = export_policy(PPO.load(src, device="cpu"), out)
+    print(f"✅ Exported {src} to {written}")
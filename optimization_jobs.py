@@ -0,0 +1,232 @@
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from optimizer import optimize_schedule_lp
+from policy_cache import get_or_train_policy, problem_fingerprint
+from utils.tracing import span, tracer
+
+
+class JobCancelled(Exception):
+    """The job was cancelled before it finished."""
+
+
+# Set in every pool worker by _init_worker
+_progress_queue = None
+_cancelled = None
+
+
+def _init_worker(progress_queue, cancelled):
+    global _progress_queue, _cancelled
+    _progress_queue = progress_queue
+    _cancelled = cancelled
+
+
+def _warm_up():
+    """
+    Starts a worker and loads the RL stack there before the first real job.
+    The app process never imports torch itself, so this is where it happens.
+    """
+    import generalist_policy
+    import train_agent_with_preferences
+    return True
+
+
+def _report(job_id, path, fraction, stage):
+    """Send progress to the page; raises JobCancelled once the job was cancelled."""
+    if job_id in _cancelled:
+        raise JobCancelled(job_id)
+    _progress_queue.put((job_id, path, fraction, stage))
+
+
+def _run_lp(job_id, prices, appliances, restricted_hours):
+    """Worker: cheapest schedule, ignoring preferences."""
+    with span("lp_job", root=True) as root:
+        _report(job_id, "lp", 0.0, "Running Linear Programming optimization...")
+        schedule, cost = optimize_schedule_lp(prices, appliances, restricted_hours)
+    _report(job_id, "lp", 1.0, "Linear Programming complete")
+    return {"schedule": schedule, "cost": cost, "spans": tracer.trace(root["trace_id"])}
+
+
+def _run_rl(job_id, prices, appliances, restricted_hours, preferences):
+    """
+    Worker: preference-aware schedule from the generalist (when within its
+    max gap of the optimum), a cached policy or a fresh training run. Training reports 0-90% and checks for cancellation
+    at every percent, so a cancelled job never reaches the policy cache.
+    """
+    from generalist_policy import schedule_with_generalist
+
+    with span("rl_job", root=True) as root:
+        _report(job_id, "rl", 0.0, "Training AI with your preferences...")
+        schedule = schedule_with_generalist(prices, appliances, restricted_hours, preferences)
+        if schedule is None:
+            from train_agent_with_preferences import run_agent_with_preferences
+
+            model = get_or_train_policy(
+                prices, appliances, restricted_hours, preferences,
+                progress=lambda done: _report(job_id, "rl", 0.9 * done, "Training AI with your preferences...")
+            )
+            _report(job_id, "rl", 0.9, "Generating optimized schedule...")
+            schedule = run_agent_with_preferences(model, prices, appliances, restricted_hours, preferences)
+    _report(job_id, "rl", 1.0, "Schedule ready")
+    return {"schedule": schedule, "spans": tracer.trace(root["trace_id"])}
+
+
+class OptimizationJob:
+    """
+    One "Optimize Schedule" request: the LP and RL paths run as separate
+    pool tasks, so the LP result does not wait for training.
+    progress and stage hold the latest report of each path ("lp", "rl").
+    """
+
+    def __init__(self, job_id, key, futures):
+        self.job_id = job_id
+        self.key = key
+        self.futures = futures
+        self.progress = {path: 0.0 for path in futures}
+        self.stage = {path: "Queued..." for path in futures}
+        self.cancelled = False
+        self.subscribers = 1
+        self.submitted = time.time()
+
+    def done(self):
+        return all(f.done() for f in self.futures.values())
+
+    @property
+    def fraction(self):
+        """Overall progress: the LP is a quarter of the work, the RL path the rest."""
+        return 0.25 * self.progress["lp"] + 0.75 * self.progress["rl"]
+
+    def result(self):
+        """{path: worker result}; raises JobCancelled or the worker's exception."""
+        if self.cancelled:
+            raise JobCancelled(self.job_id)
+        return {path: f.result() for path, f in self.futures.items()}
+
+
+class JobManager:
+    """
+    Runs optimization requests on a bounded process pool, off the Streamlit
+    script thread, so one session's training run does not stall the others.
+
+    Jobs are keyed by problem fingerprint: sessions submitting the same
+    problem share one job, and a finished job answers repeats until it is
+    pruned. Workers stream (job, path, fraction, stage) progress over a
+    queue that poll() drains. cancel() drops a session's interest; the last
+    one out cancels the job, dropping queued tasks and stopping training at
+    its next progress report.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, keep_finished=32, start_method=None):
+        if start_method is None:
+            # Streamlit runs the app script as __main__, which spawn and
+            # forkserver children would execute again; fork children do not
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._manager = ctx.Manager()
+        self._cancelled = self._manager.dict()
+        self._queue = ctx.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=ctx, initializer=_init_worker,
+            initargs=(self._queue, self._cancelled)
+        )
+        self._jobs = {}  # fingerprint -> job
+        self._by_id = {}  # job id -> job
+        self._stopping = []  # cancelled jobs whose workers may still be running
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        # Start the workers now, so the first request does not pay for their imports
+        for _ in range(max_workers):
+            self._pool.submit(_warm_up)
+
+    def submit(self, prices, appliances, restricted_hours, preferences):
+        """
+        Start (or join) the job for this problem.
+        Raises RuntimeError when max_pending jobs are already running.
+        """
+        key = problem_fingerprint(prices, appliances, restricted_hours, preferences)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.cancelled and not self._failed(job):
+                job.subscribers += 1
+                return job
+
+            self._prune()
+            if sum(not j.done() for j in self._jobs.values()) >= self.max_pending:
+                raise RuntimeError(f"Too many optimizations in progress ({self.max_pending}), try again shortly")
+
+            job_id = f"{key[:12]}-{next(self._ids)}"
+            futures = {
+                "lp": self._pool.submit(_run_lp, job_id, prices, appliances, restricted_hours),
+                "rl": self._pool.submit(_run_rl, job_id, prices, appliances, restricted_hours, preferences),
+            }
+            job = OptimizationJob(job_id, key, futures)
+            self._jobs[key] = job
+            self._by_id[job_id] = job
+        return job
+
+    def cancel(self, job):
+        """Drop one subscriber; cancel the job when none are left."""
+        with self._lock:
+            job.subscribers -= 1
+            if job.subscribers > 0 or job.done():
+                return
+            job.cancelled = True
+            self._cancelled[job.job_id] = True
+            for future in job.futures.values():
+                future.cancel()
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+            self._by_id.pop(job.job_id, None)
+            self._stopping.append(job)
+        print(f"⏹️ Cancelled optimization {job.job_id}")
+
+    def poll(self):
+        """Apply all queued progress reports to their jobs."""
+        while True:
+            try:
+                job_id, path, fraction, stage = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            job = self._by_id.get(job_id)
+            if job is not None:
+                job.progress[path] = max(job.progress[path], fraction)
+                job.stage[path] = stage
+
+    def wait(self, job, on_progress=None, interval=0.1):
+        """Block until job finishes, calling on_progress(job) after every poll."""
+        while True:
+            finished = job.done()
+            self.poll()
+            if on_progress:
+                on_progress(job)
+            if finished:
+                return job
+            time.sleep(interval)
+
+    @staticmethod
+    def _failed(job):
+        return job.done() and any(f.cancelled() or f.exception() is not None for f in job.futures.values())
+
+    def _prune(self):
+        """
+        Forget the oldest finished jobs beyond keep_finished, and the cancel
+        flags of cancelled jobs whose workers have stopped (call with the lock held).
+        """
+        finished = sorted((j for j in self._jobs.values() if j.done()), key=lambda j: j.submitted)
+        for job in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[job.key]
+            self._by_id.pop(job.job_id, None)
+        for job in [j for j in self._stopping if j.done()]:
+            self._stopping.remove(job)
+            self._cancelled.pop(job.job_id, None)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
@@ -1,49 +1,247 @@
-import pandas as pd
-import pulp
 import numpy as np
 
-def optimize_schedule_lp(prices, appliances, restricted_hours=None):
+from utils.problem_arrays import restricted_mask
+from utils.time_slots import duration_slots, label_after, slot_hours, slot_label
+from utils.tracing import span, traced
+
+def pick_cheapest_hours(cost, durations):
+    """
+    Vectorized partial sort: for each row of an (items x hours) cost matrix,
+    mark its `duration` cheapest finite-cost hours.
+
+    Returns:
+        picked: Boolean (items x hours) matrix
+    """
+    rows, num_hours = cost.shape
+    picked = np.zeros((rows, num_hours), dtype=bool)
+    k = int(min(durations.max(initial=0), num_hours))
+    if rows == 0 or k <= 0:
+        return picked
+
+    if k < num_hours:
+        cheapest = np.argpartition(cost, k - 1, axis=1)[:, :k]
+    else:
+        cheapest = np.tile(np.arange(num_hours), (rows, 1))
+    by_cost = np.argsort(np.take_along_axis(cost, cheapest, axis=1), axis=1, kind="stable")
+    cheapest = np.take_along_axis(cheapest, by_cost, axis=1)
+
+    # Take each row's first `duration` hours, never a restricted (infinite) one
+    take = np.arange(k)[None, :] < durations[:, None]
+    take &= np.isfinite(np.take_along_axis(cost, cheapest, axis=1))
+    np.put_along_axis(picked, cheapest, take, axis=1)
+    return picked
+
+
+def optimize_schedule_fast(prices, appliances, restricted_hours=None, slot_minutes=60):
+    """
+    Closed-form optimizer for the uncoupled problem.
+    Without constraints linking appliances, each appliance simply runs in its
+    `duration` cheapest non-restricted slots, found for all appliances at once
+    with one vectorized partial sort.
+
+    Args:
+        prices: Array of per-slot prices ($/kWh)
+        appliances: List of appliance dicts with name, power (kW), duration (hours)
+        restricted_hours: List of slot indices to avoid
+        slot_minutes: Length of one price slot (60, 30, 15, 5, ...)
+
+    Returns:
+        schedule: Dict mapping appliance names to list of slots
+        total_cost: Total electricity cost
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    num_hours = len(prices)
+
+    power = np.array([a['power'] for a in appliances], dtype=np.float64)
+    durations = np.array([duration_slots(a['duration'], slot_minutes) for a in appliances], dtype=np.int64)
+
+    # (appliances x slots) energy cost, restricted slots made unpickable
+    energy = np.outer(power, prices) * slot_hours(slot_minutes)
+    cost = energy.copy()
+    cost[:, restricted_mask(restricted_hours, num_hours)] = np.inf
+
+    picked = pick_cheapest_hours(cost, durations)
+
+    schedule = {}
+    for i, a in enumerate(appliances):
+        schedule[a['name']] = np.flatnonzero(picked[i]).tolist()
+
+    total_cost = float(energy[picked].sum())
+
+    return schedule, total_cost
+
+
+def build_schedule_milp(prices, appliances, restricted_hours=None, max_concurrent=None, slot_minutes=60):
+    """
+    Assemble the matrix-form MILP of optimize_schedule_milp as sparse arrays.
+    Variables exist only for non-restricted hours, laid out appliance-major:
+    x[a * num_free + j] = 1 if appliance a runs in the j-th free hour.
+
+    Returns:
+        model: Dict with c, duration_rows, durations, concurrency_rows (None
+            when uncoupled) and free_hours, or None if there is nothing to schedule
+    """
+    from scipy import sparse
+
+    prices = np.asarray(prices, dtype=np.float64)
+    num_hours = len(prices)
+
+    free_hours = np.flatnonzero(~restricted_mask(restricted_hours, num_hours))
+    num_free = len(free_hours)
+    num_appliances = len(appliances)
+    if num_appliances == 0 or num_free == 0:
+        return None
+
+    power = np.array([a['power'] for a in appliances], dtype=np.float64)
+    durations = np.array([duration_slots(a['duration'], slot_minutes) for a in appliances], dtype=np.float64)
+
+    # Objective: minimize total cost
+    c = np.outer(power, prices[free_hours]).ravel() * slot_hours(slot_minutes)
+
+    # Each appliance runs exactly for its duration
+    duration_rows = sparse.kron(sparse.identity(num_appliances, format="csr"), np.ones((1, num_free)), format="csr")
+    # Coupling: limit how many appliances run at once
+    concurrency_rows = None
+    if max_concurrent is not None:
+        concurrency_rows = sparse.kron(np.ones((1, num_appliances)), sparse.identity(num_free, format="csr"), format="csr")
+
+    return {"c": c, "duration_rows": duration_rows, "durations": durations,
+            "concurrency_rows": concurrency_rows, "free_hours": free_hours}
+
+
+def optimize_schedule_milp(prices, appliances, restricted_hours=None, max_concurrent=None, slot_minutes=60):
+    """
+    Matrix-form MILP solved in-process by HiGHS (no model objects, temp files or subprocess).
+    The constraint matrix is assembled directly as sparse arrays by build_schedule_milp.
+
+    Args:
+        prices: Array of per-slot prices ($/kWh)
+        appliances: List of appliance dicts with name, power (kW), duration (hours)
+        restricted_hours: List of slot indices to avoid
+        max_concurrent: Optional cap on appliances running in the same slot
+        slot_minutes: Length of one price slot
+
+    Returns:
+        schedule: Dict mapping appliance names to list of slots (empty when infeasible)
+        total_cost: Total electricity cost, nan when no schedule meets the constraints
+    """
+    from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+    schedule = {a['name']: [] for a in appliances}
+    with span("milp_build"):
+        model = build_schedule_milp(prices, appliances, restricted_hours, max_concurrent, slot_minutes)
+    if model is None:
+        # No appliances, or no free slot for any of them
+        if any(duration_slots(a['duration'], slot_minutes) > 0 for a in appliances):
+            print("⚠️ No feasible schedule: every slot is restricted")
+            return schedule, float("nan")
+        return schedule, 0.0
+    c, durations = model["c"], model["durations"]
+    duration_rows, concurrency_rows = model["duration_rows"], model["concurrency_rows"]
+    free_hours = model["free_hours"]
+    num_appliances, num_free = len(appliances), len(free_hours)
+
+    # Both row blocks together are the incidence matrix of a bipartite graph
+    # (appliances x hours), which is totally unimodular: a simplex vertex of
+    # the LP relaxation is already integral, at about half the cost of branch-and-bound.
+    with span("highs_solve", variables=len(c)):
+        result = linprog(
+            c,
+            A_ub=concurrency_rows,
+            b_ub=np.full(num_free, max_concurrent) if concurrency_rows is not None else None,
+            A_eq=duration_rows,
+            b_eq=durations,
+            bounds=(0, 1),
+            method="highs-ds",
+        )
+        x = result.x
+        if x is not None and np.abs(x - np.round(x)).max() > 1e-6:
+            constraints = [LinearConstraint(duration_rows, durations, durations)]
+            if concurrency_rows is not None:
+                constraints.append(LinearConstraint(concurrency_rows, -np.inf, max_concurrent))
+            x = milp(c, constraints=constraints, integrality=np.ones_like(c), bounds=Bounds(0, 1)).x
+    if x is None:
+        print(f"⚠️ No feasible schedule: {result.message}")
+        return schedule, float("nan")
+
+    run = x.reshape(num_appliances, num_free) > 0.5
+    for i, a in enumerate(appliances):
+        schedule[a['name']] = free_hours[run[i]].tolist()
+
+    total_cost = float(c[run.ravel()].sum())
+
+    return schedule, total_cost
+
+
+@traced()
+def optimize_schedule_lp(prices, appliances, restricted_hours=None, max_concurrent=None, backend="highs",
+                         slot_minutes=60):
     """
     Linear programming optimizer - finds the absolute cheapest schedule.
     Guaranteed optimal but ignores user preferences/comfort.
+    Uncoupled problems are solved in closed form by optimize_schedule_fast;
+    the MILP is only built when a coupling constraint is given.
+    Prices may be sub-hourly (e.g. 288 five-minute slots); durations stay in
+    hours and every index in and out of the solver is a slot index.
     
     Args:
-        prices: Array of hourly prices
-        appliances: List of appliance dicts with name, power, duration
-        restricted_hours: List of hour indices to avoid
+        prices: Array of per-slot prices ($/kWh)
+        appliances: List of appliance dicts with name, power (kW), duration (hours)
+        restricted_hours: List of slot indices to avoid
+        max_concurrent: Optional cap on appliances running in the same slot
+        backend: "highs" (in-process matrix MILP) or "pulp" (CBC subprocess)
+        slot_minutes: Length of one price slot (default: hourly)
     
     Returns:
-        schedule: Dict mapping appliance names to list of hours
-        total_cost: Total electricity cost
+        schedule: Dict mapping appliance names to list of slots
+        total_cost: Total electricity cost; with max_concurrent, nan (and an
+            empty schedule) when the coupled problem is infeasible
     """
+    if max_concurrent is None:
+        return optimize_schedule_fast(prices, appliances, restricted_hours, slot_minutes)
+    if backend == "highs":
+        return optimize_schedule_milp(prices, appliances, restricted_hours, max_concurrent, slot_minutes)
+
+    import pulp
+
     num_hours = len(prices)
     hour_indices = range(num_hours)
     restricted_hours = restricted_hours or []
+    hours_per_slot = slot_hours(slot_minutes)
 
-    model = pulp.LpProblem("CostOptimization", pulp.LpMinimize)
+    with span("pulp_build"):
+        model = pulp.LpProblem("CostOptimization", pulp.LpMinimize)
 
-    # Binary variable for each appliance-hour
-    run = {
-        (a['name'], h): pulp.LpVariable(f"{a['name']}_hour{h}", cat="Binary")
-        for a in appliances for h in hour_indices
-    }
+        # Binary variable for each appliance-hour
+        run = {
+            (a['name'], h): pulp.LpVariable(f"{a['name']}_hour{h}", cat="Binary")
+            for a in appliances for h in hour_indices
+        }
 
-    # Objective: minimize total cost
-    model += pulp.lpSum(
-        run[(a['name'], h)] * a['power'] * prices[h]
-        for a in appliances for h in hour_indices
-    )
+        # Objective: minimize total cost
+        model += pulp.lpSum(
+            run[(a['name'], h)] * a['power'] * prices[h] * hours_per_slot
+            for a in appliances for h in hour_indices
+        )
 
-    # Constraints: each appliance runs exactly for its duration
-    for a in appliances:
-        model += pulp.lpSum(run[(a['name'], h)] for h in hour_indices) == a['duration']
+        # Constraints: each appliance runs exactly for its duration
+        for a in appliances:
+            model += pulp.lpSum(run[(a['name'], h)] for h in hour_indices) == duration_slots(a['duration'], slot_minutes)
 
-        # Cannot run in restricted hours
-        for h in restricted_hours:
-            if h in hour_indices:
-                model += run[(a['name'], h)] == 0
+            # Cannot run in restricted hours
+            for h in restricted_hours:
+                if h in hour_indices:
+                    model += run[(a['name'], h)] == 0
 
-    model.solve(pulp.PULP_CBC_CMD(msg=0))
+        # Coupling: limit how many appliances run at once
+        for h in hour_indices:
+            model += pulp.lpSum(run[(a['name'], h)] for a in appliances) <= max_concurrent
+
+    with span("cbc_solve"):
+        model.solve(pulp.PULP_CBC_CMD(msg=0))
+    if pulp.LpStatus[model.status] != "Optimal":
+        print(f"⚠️ No feasible schedule: {pulp.LpStatus[model.status]}")
+        return {a['name']: [] for a in appliances}, float("nan")
 
     # Extract schedule
     schedule = {}
@@ -53,7 +251,7 @@ def optimize_schedule_lp(prices, appliances, restricted_hours=None):
 
     # Calculate total cost
     total_cost = sum(
-        prices[h] * a['power']
+        prices[h] * a['power'] * hours_per_slot
         for a in appliances
         for h in schedule[a['name']]
     )
@@ -61,8 +259,19 @@ def optimize_schedule_lp(prices, appliances, restricted_hours=None):
     return schedule, total_cost
 
 
-def format_schedule_readable(schedule, appliances):
-    """Format schedule into human-readable time ranges"""
+def format_schedule_readable(schedule, appliances, slot_minutes=60, slot_times=None):
+    """
+    Format schedule (slot indices) into human-readable time ranges such as 7:15–8:30.
+    slot_times holds the clock label of every slot (the price table's "time"
+    column); without it slot 0 is taken to start at midnight.
+    """
+    def label(slot):
+        if slot_times is None:
+            return slot_label(slot, slot_minutes)
+        if slot < len(slot_times):
+            return slot_times[slot]
+        return label_after(slot_times[-1], (slot - len(slot_times) + 1) * slot_minutes)
+
     readable = {}
     
     for name, hours in schedule.items():
@@ -76,10 +285,10 @@ def format_schedule_readable(schedule, appliances):
         
         for h in hours[1:]:
             if h != prev + 1:
-                ranges.append(f"{start}:00–{prev+1}:00")
+                ranges.append(f"{label(start)}–{label(prev + 1)}")
                 start = h
             prev = h
-        ranges.append(f"{start}:00–{prev+1}:00")
+        ranges.append(f"{label(start)}–{label(prev + 1)}")
         
         readable[name] = ", ".join(ranges)
     
@@ -0,0 +1,107 @@
+import numpy as np
+
+from optimizer import pick_cheapest_hours
+from utils.problem_arrays import comfort_matrix, restricted_mask
+from utils.time_slots import duration_slots, slot_hours
+
+
+def _comfort_weight_breakpoints(energy, comfort, allowed, durations):
+    """
+    Comfort weights at which some appliance's set of cheapest hours changes.
+    Appliances are independent, so each one walks its own path: from the
+    current weight, the next breakpoint is the first weight at which a chosen
+    hour and an unchosen hour swap ranks. Between consecutive breakpoints the
+    optimal schedule is constant. The walk only visits weights where the
+    schedule changes, instead of every pairwise rank flip (O(hours^2)).
+    """
+    e = energy[:, allowed]
+    c = comfort[:, allowed]
+    num_free = e.shape[1]
+    breakpoints = []
+    for i, k in enumerate(np.minimum(durations, num_free)):
+        if k <= 0 or k >= num_free or np.ptp(c[i]) == 0:
+            continue
+        weight = 0.0
+        while True:
+            # Chosen hours just above `weight`: ties go to the lower comfort penalty
+            order = np.lexsort((c[i], e[i] + weight * c[i]))
+            chosen, rest = order[:k], order[k:]
+            # A chosen hour with more comfort penalty loses its place to a cheaper-comfort one
+            gap = c[i, chosen][:, None] - c[i, rest][None, :]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                flips = (e[i, rest][None, :] - e[i, chosen][:, None]) / gap
+            flips = flips[(gap > 0) & (flips > weight + 1e-12 * max(1.0, weight))]
+            if not len(flips):
+                break
+            weight = float(flips.min())
+            breakpoints.append(weight)
+    return np.unique(breakpoints)
+
+
+def pareto_frontier(prices, appliances, restricted_hours=None, preferences=None, comfort_weights=None,
+                    slot_minutes=60):
+    """
+    Exact cost-comfort Pareto frontier.
+    Each point minimizes energy cost + weight * comfort penalty exactly
+    (weight 0 is the LP schedule, weight 1 the RL reward's balance). By default
+    the sweep visits one weight per interval between the breakpoints where any
+    appliance's chosen hours change, so every supported Pareto point is returned. Cost and
+    comfort matrices are built once and all weights are solved in one
+    vectorized partial sort.
+
+    Args:
+        prices: Array of per-slot prices
+        appliances: List of appliance dicts with name, power, duration (hours)
+        restricted_hours: List of slot indices to avoid
+        preferences: Per-appliance comfort preferences (slot-indexed) as used by the RL env
+        comfort_weights: Optional explicit weights (>= 0) to sweep instead
+        slot_minutes: Length of one price slot; cost and comfort are hourly rates scaled by it
+
+    Returns:
+        frontier: List of dicts with weight, schedule, cost and comfort_penalty,
+            one per distinct non-dominated schedule, cheapest first
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    num_hours = len(prices)
+
+    power = np.array([a["power"] for a in appliances], dtype=np.float64)
+    durations = np.array([duration_slots(a["duration"], slot_minutes) for a in appliances], dtype=np.int64)
+    hours_per_slot = slot_hours(slot_minutes)
+    energy = np.outer(power, prices) * hours_per_slot
+    comfort = comfort_matrix(appliances, num_hours, preferences) * hours_per_slot
+
+    allowed = ~restricted_mask(restricted_hours, num_hours)
+
+    if comfort_weights is None:
+        breakpoints = _comfort_weight_breakpoints(energy, comfort, allowed, durations)
+        if len(breakpoints):
+            midpoints = (breakpoints[:-1] + breakpoints[1:]) / 2
+            weights = np.concatenate([[0.0], breakpoints[:1] / 2, midpoints, breakpoints[-1:] * 2])
+        else:
+            weights = np.array([0.0, 1.0])
+    else:
+        weights = np.asarray(comfort_weights, dtype=np.float64)
+
+    # (weights x appliances x hours) objective, flattened so one partial sort solves every weight
+    objective = energy[None, :, :] + weights[:, None, None] * comfort[None, :, :]
+    objective[:, :, ~allowed] = np.inf
+    picked = pick_cheapest_hours(
+        objective.reshape(-1, num_hours), np.tile(durations, len(weights))
+    ).reshape(len(weights), len(appliances), num_hours)
+
+    costs = (picked * energy).sum(axis=(1, 2))
+    comfort_penalties = (picked * comfort).sum(axis=(1, 2))
+
+    frontier = []
+    for i in np.lexsort((comfort_penalties, costs)):
+        # Skip repeats and points dominated by an already-kept (cheaper) one
+        if frontier and comfort_penalties[i] >= frontier[-1]["comfort_penalty"] - 1e-12:
+            continue
+        frontier.append({
+            "weight": float(weights[i]),
+            "schedule": {a["name"]: np.flatnonzero(picked[i, j]).tolist() for j, a in enumerate(appliances)},
+            "cost": float(costs[i]),
+            "comfort_penalty": float(comfort_penalties[i]),
+        })
+    return frontier
+
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = "models/cache"
+
+
+def _reward_settings():
+    """The preference env's reward constants; a policy trained under other values is a different policy."""
+    from energy_env_with_preferences import EnergyEnvWithPreferences
+
+    return {
+        "restricted_penalty": EnergyEnvWithPreferences.restricted_penalty,
+        "unscheduled_penalty": EnergyEnvWithPreferences.unscheduled_penalty,
+    }
+
+
+def problem_fingerprint(prices, appliances, restricted_hours, preferences, slot_minutes=60):
+    """
+    Canonical SHA-256 hash of a scheduling problem.
+    Appliance order is kept (it fixes the action layout of the policy);
+    hour lists are sorted and deduplicated, floats rounded to 6 places.
+    The slot length and the env's reward settings are part of the key.
+    """
+    canonical = {
+        "slot_minutes": int(slot_minutes),
+        "reward": _reward_settings(),
+        "prices": [round(float(p), 6) for p in prices],
+        "appliances": [
+            [a["name"], round(float(a["power"]), 6), round(float(a["duration"]), 6)] for a in appliances
+        ],
+        "restricted_hours": sorted({int(h) for h in restricted_hours or []}),
+        "preferences": {
+            name: {
+                "avoid_hours": sorted({int(h) for h in pref.get("avoid_hours", [])}),
+                "avoid_penalty": round(float(pref.get("avoid_penalty", 2.0)), 6),
+                "preferred_hours": sorted({int(h) for h in pref.get("preferred_hours", [])}),
+                "preferred_bonus": round(float(pref.get("preferred_bonus", 1.0)), 6),
+            }
+            for name, pref in (preferences or {}).items()
+        },
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PolicyCache:
+    """
+    Two-tier cache of trained PPO policies keyed by problem fingerprint.
+    Tier 1 is an in-process LRU of loaded models; tier 2 is a directory of
+    saved .zip files, evicted least-recently-used first once it grows
+    past max_disk_bytes.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_memory_entries=16, max_disk_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.zip")
+
+    def get(self, key):
+        """Return the cached model for key, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        from stable_baselines3 import PPO
+
+        try:
+            model = PPO.load(path)
+        except Exception as e:
+            print(f"⚠️ Dropping unreadable cached policy {path}: {e}")
+            os.remove(path)
+            return None
+        os.utime(path)  # mark as recently used for disk eviction
+        self._remember(key, model)
+        return model
+
+    def put(self, key, model):
+        """Store model in both tiers."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        model.save(self._path(key))
+        self._remember(key, model)
+        self._evict_disk(keep=self._path(key))
+
+    def _remember(self, key, model):
+        with self._lock:
+            self._memory[key] = model
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self, keep=None):
+        entries = []
+        for fname in os.listdir(self.cache_dir):
+            if fname.endswith(".zip") and os.path.join(self.cache_dir, fname) != keep:
+                path = os.path.join(self.cache_dir, fname)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if keep and os.path.exists(keep):
+            total += os.path.getsize(keep)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+# Module-level instance: shared by every Streamlit session in this process
+policy_cache = PolicyCache()
+
+
+def get_or_train_policy(prices, appliances, restricted_hours, preferences, cache=None, warm_start=True,
+                        progress=None, slot_minutes=60):
+    """
+    Return a trained policy for this exact problem, training only on a cache miss.
+    Misses fine-tune the nearest compatible checkpoint when one exists, until
+    the convergence check passes or the from-scratch budget is spent.
+    progress(fraction) follows training as in train_agent_with_preferences.
+    """
+    from train_agent_with_preferences import train_agent_with_preferences
+
+    cache = cache or policy_cache
+    key = problem_fingerprint(prices, appliances, restricted_hours, preferences, slot_minutes)
+
+    model = cache.get(key)
+    if model is not None:
+        print(f"✅ Reusing cached policy {key[:12]}")
+        if progress:
+            progress(1.0)
+        return model
+
+    model = train_agent_with_preferences(
+        prices, appliances, restricted_hours, preferences, save_path=None, warm_start=warm_start,
+        progress=progress, slot_minutes=slot_minutes
+    )
+    cache.put(key, model)
+    return model
@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+# The solver modules import SciPy on first use; load it here so the first
+# call's budget is not spent importing it
+import scipy.optimize
+
+from energy_env_with_preferences import EnergyEnvWithPreferences
+from exact_solver import optimize_schedule_exact, schedule_objective
+from optimizer import optimize_schedule_lp, pick_cheapest_hours
+from utils.problem_arrays import comfort_matrix, restricted_mask
+from utils.time_slots import duration_slots, slot_hours
+from utils.tracing import traced
+
+# Candidates are scored on the preference env's reward
+UNSCHEDULED_PENALTY = EnergyEnvWithPreferences.unscheduled_penalty
+
+# Shared by every call; strategies that miss a deadline finish in the background
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="portfolio")
+
+# Wall time (ms) of recent runs per (strategy, size class), including ones that
+# finished after their deadline, and how many calls in a row skipped each
+_run_ms = defaultdict(lambda: deque(maxlen=5))
+_skips = defaultdict(int)
+REPROBE_AFTER = 20  # skipped calls before a strategy is run again anyway
+
+
+def _size_class(num_slots, num_appliances):
+    """Power-of-two bucket of slots x appliances; run times are only compared within one."""
+    return int(np.log2(max(num_slots * num_appliances, 1)))
+
+
+def _expected_ms(key):
+    """Median of the recent run times for (strategy, size class); 0 before it has run."""
+    runs = _run_ms[key]
+    return float(np.median(runs)) if runs else 0.0
+
+
+def _submit(key, *args):
+    """Start a strategy, recording its run time under key whenever it finishes."""
+    submitted = time.perf_counter()
+    future = _executor.submit(STRATEGIES[key[0]], *args)
+    future.add_done_callback(lambda f: _run_ms[key].append((time.perf_counter() - submitted) * 1000))
+    return future
+
+
+def _greedy_schedule(prices, appliances, restricted_hours, preferences, slot_minutes):
+    """
+    Each appliance in its cheapest energy-plus-comfort slots, ignoring the
+    concurrency penalty. Returns the schedule, its energy-plus-comfort cost
+    (a lower bound on any feasible schedule's objective) and its energy cost.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    power = np.array([a["power"] for a in appliances], dtype=np.float64)
+    durations = np.array([duration_slots(a["duration"], slot_minutes) for a in appliances], dtype=np.int64)
+    energy = np.outer(power, prices) * slot_hours(slot_minutes)
+    cost = energy + comfort_matrix(appliances, len(prices), preferences) * slot_hours(slot_minutes)
+    allowed_cost = cost.copy()
+    allowed_cost[:, restricted_mask(restricted_hours, len(prices))] = np.inf
+    picked = pick_cheapest_hours(allowed_cost, durations)
+    schedule = {a["name"]: np.flatnonzero(picked[i]).tolist() for i, a in enumerate(appliances)}
+    return schedule, float(cost[picked].sum()), float(energy[picked].sum())
+
+
+def _cached_policy_schedule(prices, appliances, restricted_hours, preferences, slot_minutes):
+    """
+    Roll out a policy that is already trained: the policy cache entry for this
+    exact problem, else the generalist. Never trains; None when neither exists.
+    Only the NumPy generalist export is used until something else in the
+    process has loaded stable-baselines3: importing torch from a worker thread
+    holds the GIL for seconds and would stall the whole portfolio past any
+    sub-second budget.
+    """
+    if slot_minutes != 60:
+        return None
+    from generalist_policy import GENERALIST_PATH, schedule_with_generalist
+
+    rl_loaded = "stable_baselines3" in sys.modules
+    if rl_loaded:
+        from policy_cache import policy_cache, problem_fingerprint
+        from train_agent_with_preferences import run_agent_with_preferences
+
+        model = policy_cache.get(problem_fingerprint(prices, appliances, restricted_hours, preferences, slot_minutes))
+        if model is not None:
+            return run_agent_with_preferences(model, prices, appliances, restricted_hours, preferences)
+    if rl_loaded or os.path.exists(f"{GENERALIST_PATH}.npz"):
+        # Scored against the other strategies here, so no gap check of its own
+        return schedule_with_generalist(prices, appliances, restricted_hours, preferences, max_gap=None)
+    return None
+
+
+STRATEGIES = {
+    "exact": lambda p, a, r, pref, m: optimize_schedule_exact(
+        p, a, r, pref, unscheduled_penalty=UNSCHEDULED_PENALTY, slot_minutes=m)[0],
+    "lp": lambda p, a, r, pref, m: optimize_schedule_lp(p, a, r, slot_minutes=m)[0],
+    "cached_rl": _cached_policy_schedule,
+}
+
+
+def is_feasible(schedule, appliances, restricted_hours, num_slots, slot_minutes=60):
+    """Every appliance gets exactly its duration in distinct, in-range, non-restricted slots."""
+    restricted = set(restricted_hours or [])
+    for a in appliances:
+        slots = schedule.get(a["name"]) or []
+        if len(set(slots)) != len(slots) or len(slots) != duration_slots(a["duration"], slot_minutes):
+            return False
+        if any(s in restricted or not 0 <= s < num_slots for s in slots):
+            return False
+    return True
+
+
+@traced()
+def optimize(prices, appliances, restricted_hours=None, preferences=None, budget_ms=500, strategies=None,
+             slot_minutes=60, scoring_margin_ms=1.0):
+    """
+    Anytime solver portfolio with a hard latency budget.
+
+    The greedy heuristic runs first, so there is always an answer. The other
+    strategies (exact LP, energy-only LP, cached RL policy) then run in
+    parallel. A strategy is only started if its recent runs on problems of
+    the same size fit in the budget, so tight budgets do not pay for threads
+    that cannot finish; after REPROBE_AFTER skips it is run again to refresh
+    its timing. Waiting
+    stops scoring_margin_ms before the deadline, leaving time to score the
+    results and return. Every feasible schedule is scored on the
+    EnergyEnvWithPreferences objective (energy + comfort + concurrency), and
+    the best one wins. Strategies still running at the deadline are
+    abandoned: queued ones are cancelled, running ones finish in the
+    background.
+
+    Args:
+        prices: Array of per-slot prices
+        appliances: List of appliance dicts with name, power, duration
+        restricted_hours: List of slot indices to avoid
+        preferences: Optional per-appliance comfort preferences
+        budget_ms: Wall-clock budget for the whole call
+        strategies: Names from STRATEGIES to run (default: all)
+        slot_minutes: Length of one price slot
+        scoring_margin_ms: Time kept back from the budget to score and return
+
+    Returns:
+        result: Dict with schedule, strategy, objective, bound, gap (relative
+            excess over the bound, 0.0 when proven optimal), elapsed_ms and
+            per-strategy outcomes under "strategies"
+    """
+    start = time.perf_counter()
+    stop_waiting = start + max(budget_ms - scoring_margin_ms, 0.0) / 1000.0
+    restricted_hours = restricted_hours or []
+    num_slots = len(prices)
+
+    def score(schedule):
+        return schedule_objective(prices, appliances, schedule, preferences,
+                                  unscheduled_penalty=UNSCHEDULED_PENALTY, slot_minutes=slot_minutes)
+
+    greedy, bound, energy_cost = _greedy_schedule(prices, appliances, restricted_hours, preferences, slot_minutes)
+    outcomes = {"greedy": {"ms": (time.perf_counter() - start) * 1000,
+                           "feasible": is_feasible(greedy, appliances, restricted_hours, num_slots, slot_minutes)}}
+    candidates = []
+    if outcomes["greedy"]["feasible"]:
+        outcomes["greedy"]["objective"] = score(greedy)
+        candidates.append((outcomes["greedy"]["objective"], "greedy", greedy))
+
+    names = list(strategies) if strategies is not None else list(STRATEGIES)
+    size = _size_class(num_slots, len(appliances))
+    futures = {}
+    for name in names:
+        key = (name, size)
+        expected_ms = _expected_ms(key)
+        if expected_ms > (stop_waiting - time.perf_counter()) * 1000 and _skips[key] < REPROBE_AFTER:
+            _skips[key] += 1
+            outcomes[name] = {"over_budget": True, "expected_ms": expected_ms}
+            continue
+        _skips[key] = 0
+        futures[_submit(key, prices, appliances, restricted_hours, preferences, slot_minutes)] = name
+    pending = set(futures)
+    proven_optimal = False
+    while pending and not proven_optimal:
+        remaining = stop_waiting - time.perf_counter()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        if time.perf_counter() > stop_waiting:
+            # Woke up late (another thread held the GIL): leave these unscored
+            pending |= done
+            break
+        for future in done:
+            name = futures[future]
+            outcome = outcomes[name] = {"ms": (time.perf_counter() - start) * 1000}
+            try:
+                schedule = future.result()
+            except Exception as e:
+                outcome["error"] = str(e)
+                continue
+            if schedule is None:
+                outcome["unavailable"] = True
+                continue
+            outcome["feasible"] = is_feasible(schedule, appliances, restricted_hours, num_slots, slot_minutes)
+            if not outcome["feasible"]:
+                continue
+            outcome["objective"] = score(schedule)
+            candidates.append((outcome["objective"], name, schedule))
+            if name == "exact":
+                # The exact optimum closes the gap; nothing else can beat it
+                bound = outcome["objective"]
+                proven_optimal = True
+
+    for future in pending:
+        future.cancel()
+        outcomes[futures[future]] = {"skipped": True} if proven_optimal else {"timed_out": True}
+
+    result = {"schedule": None, "strategy": None, "objective": None, "bound": bound, "gap": None}
+    if candidates:
+        objective, name, schedule = min(candidates, key=lambda c: c[0])
+        # Relative to the bound, or to the energy cost when comfort bonuses pull the bound near zero
+        scale = max(abs(bound), energy_cost)
+        excess = max(objective - bound, 0.0)
+        result.update(schedule=schedule, strategy=name, objective=objective,
+                      gap=excess / scale if scale else excess)
+    result["elapsed_ms"] = (time.perf_counter() - start) * 1000
+    result["strategies"] = outcomes
+    return result
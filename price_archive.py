@@ -0,0 +1,119 @@
+import os
+
+import numpy as np
+
+ARCHIVE_DIR = "data/archive"
+
+
+class PriceArchive:
+    """
+    Append-only price history stored as raw typed columns:
+    <series>.ts (int64 UTC millis, strictly increasing) and <series>.price (float64 $/kWh).
+    Reads memory-map both files, so range queries return zero-copy views and
+    months of history never have to be loaded into pandas. The sorted
+    timestamp column doubles as the time index (binary search).
+    """
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self._maps = {}  # series -> (rows, ts view, price view)
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, series):
+        base = os.path.join(self.root, series)
+        return f"{base}.ts", f"{base}.price"
+
+    @staticmethod
+    def _repair(ts_path, price_path):
+        """
+        Cut both columns back to their complete rows. A torn append leaves
+        one column longer; appending after its leftover bytes would pair
+        every later timestamp with the wrong price.
+        """
+        if not os.path.exists(ts_path) or not os.path.exists(price_path):
+            for path in (ts_path, price_path):
+                if os.path.exists(path):
+                    os.truncate(path, 0)
+            return
+        sizes = os.path.getsize(ts_path), os.path.getsize(price_path)
+        rows = min(sizes) // 8
+        for path, size in zip((ts_path, price_path), sizes):
+            if size != rows * 8:
+                os.truncate(path, rows * 8)
+
+    def columns(self, series):
+        """Read-only (timestamps, prices) memory-mapped views of a whole series."""
+        ts_path, price_path = self._paths(series)
+        if not os.path.exists(ts_path) or not os.path.exists(price_path):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        # A torn append leaves one column longer; only complete rows are visible
+        rows = min(os.path.getsize(ts_path) // 8, os.path.getsize(price_path) // 8)
+        cached = self._maps.get(series)
+        if cached is None or cached[0] != rows:
+            if rows == 0:
+                ts = np.empty(0, dtype=np.int64)
+                prices = np.empty(0, dtype=np.float64)
+            else:
+                ts = np.memmap(ts_path, dtype=np.int64, mode="r", shape=(rows,))
+                prices = np.memmap(price_path, dtype=np.float64, mode="r", shape=(rows,))
+            cached = (rows, ts, prices)
+            self._maps[series] = cached
+        return cached[1], cached[2]
+
+    def append(self, series, millis, prices):
+        """
+        Append points newer than the last stored one. Returns the number written.
+        """
+        millis = np.asarray(millis, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        order = np.argsort(millis, kind="stable")
+        millis, prices = millis[order], prices[order]
+
+        ts, _ = self.columns(series)
+        if len(ts):
+            keep = millis > ts[-1]
+            millis, prices = millis[keep], prices[keep]
+        if len(millis) > 1:
+            # Drop duplicate timestamps within the batch
+            unique = np.concatenate([[True], np.diff(millis) > 0])
+            millis, prices = millis[unique], prices[unique]
+        if len(millis) == 0:
+            return 0
+
+        ts_path, price_path = self._paths(series)
+        self._repair(ts_path, price_path)
+        # Prices first: a crash between the writes leaves no row with a bad timestamp
+        with open(price_path, "ab") as f:
+            prices.tofile(f)
+        with open(ts_path, "ab") as f:
+            millis.tofile(f)
+        return len(millis)
+
+    def range(self, series, start_millis=None, end_millis=None):
+        """Zero-copy (timestamps, prices) views for start <= t < end."""
+        ts, prices = self.columns(series)
+        lo = 0 if start_millis is None else int(np.searchsorted(ts, start_millis, side="left"))
+        hi = len(ts) if end_millis is None else int(np.searchsorted(ts, end_millis, side="left"))
+        return ts[lo:hi], prices[lo:hi]
+
+    def resample(self, series, start_millis, end_millis, step_millis=3_600_000):
+        """
+        Average prices into fixed buckets of step_millis over [start, end).
+        Returns (bucket start millis, mean price); empty buckets are NaN.
+        """
+        ts, prices = self.range(series, start_millis, end_millis)
+        edges = np.arange(start_millis, end_millis, step_millis, dtype=np.int64)
+        bounds = np.searchsorted(ts, edges, side="left")
+        counts = np.diff(np.append(bounds, len(ts)))
+
+        means = np.full(len(edges), np.nan)
+        filled = counts > 0
+        if filled.any():
+            sums = np.add.reduceat(prices, bounds[filled]) if len(prices) else np.empty(0)
+            means[filled] = sums / counts[filled]
+        return edges, means
+
+    def series(self):
+        """Names of the stored series."""
+        return sorted(f[:-3] for f in os.listdir(self.root) if f.endswith(".ts"))
@@ -0,0 +1,174 @@
+import asyncio
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+COMED_API = "https://hourlypricing.comed.com/api"
+
+
+class FeedAdapter:
+    """
+    One price feed: where to fetch it and how to turn its payload into
+    (millisUTC, $/kWh) points. Other utilities subclass this and call register_feed.
+    """
+
+    name = None
+    url = None
+    deadline = 5.0  # seconds for the whole fetch, retries included
+
+    def parse(self, payload):
+        raise NotImplementedError
+
+
+class ComEdFeed(FeedAdapter):
+    """ComEd hourly pricing API: a list of {"millisUTC", "price" (cents/kWh)} points."""
+
+    def __init__(self, name, feed_type, deadline=5.0):
+        self.name = name
+        self.url = f"{COMED_API}?type={feed_type}"
+        self.deadline = deadline
+
+    def parse(self, payload):
+        points = []
+        for point in payload:
+            try:
+                points.append((int(point["millisUTC"]), float(point["price"]) / 100.0))
+            except (KeyError, TypeError, ValueError):
+                continue
+        points.sort()
+        return points
+
+
+FEEDS = {}
+
+
+def register_feed(adapter):
+    """Make a feed adapter available to AsyncPriceFetcher by its name."""
+    FEEDS[adapter.name] = adapter
+    return adapter
+
+
+register_feed(ComEdFeed("comed_5min", "5minutefeed"))
+register_feed(ComEdFeed("comed_hour", "currenthouraverage", deadline=3.0))
+
+
+class AsyncPriceFetcher:
+    """
+    Fetches several price feeds concurrently on asyncio.
+
+    Requests go through one pooled requests.Session, so repeat refreshes reuse
+    keep-alive connections instead of a new TLS handshake per call. Each feed
+    remembers its ETag / Last-Modified and sends a conditional request; a 304
+    answers from the cached points. Connection errors, timeouts and 5xx/429
+    responses are retried with jittered exponential backoff, and every feed is
+    bounded by its own deadline so a slow API cannot stall the others.
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, feeds=None, session=None, pool_size=8, retries=3, backoff=0.25,
+                 attempt_timeout=10.0):
+        self.feeds = dict(feeds) if feeds is not None else dict(FEEDS)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self.retries = retries
+        self.backoff = backoff
+        self.attempt_timeout = attempt_timeout
+        # feed name -> (etag, last_modified, points). Keyed by feed, not URL: incremental
+        # callers change the URL's date range on every call, and a 304 for the new
+        # range means nothing arrived since the cached points
+        self._validators = {}
+
+    def _get(self, feed, url, timeout):
+        headers = {"User-Agent": "Mozilla/5.0"}
+        cached = self._validators.get(feed.name)
+        if cached:
+            if cached[0]:
+                headers["If-None-Match"] = cached[0]
+            if cached[1]:
+                headers["If-Modified-Since"] = cached[1]
+        return self.session.get(url, headers=headers, timeout=timeout)
+
+    async def fetch(self, name, url=None):
+        """
+        Fetch one feed within its deadline.
+
+        Returns:
+            result: Dict with name, points [(millisUTC, $/kWh)], not_modified,
+                attempts, seconds and error (None on success)
+        """
+        feed = self.feeds[name]
+        url = url or feed.url
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + feed.deadline
+        result = {"name": name, "points": [], "not_modified": False, "attempts": 0,
+                  "seconds": 0.0, "error": None}
+
+        for attempt in range(self.retries + 1):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                result["error"] = result["error"] or "deadline exceeded"
+                break
+            result["attempts"] = attempt + 1
+            try:
+                r = await asyncio.wait_for(
+                    asyncio.to_thread(self._get, feed, url, min(remaining, self.attempt_timeout)),
+                    timeout=remaining,
+                )
+            except (asyncio.TimeoutError, requests.RequestException) as e:
+                result["error"] = str(e) or type(e).__name__
+            else:
+                if r.status_code == 304 and feed.name in self._validators:
+                    result["points"] = self._validators[feed.name][2]
+                    result["not_modified"] = True
+                    result["error"] = None
+                    break
+                if r.status_code not in self.RETRY_STATUS:
+                    try:
+                        r.raise_for_status()
+                        result["points"] = feed.parse(r.json())
+                        result["error"] = None
+                        self._validators[feed.name] = (
+                            r.headers.get("ETag"), r.headers.get("Last-Modified"), result["points"]
+                        )
+                    except (requests.RequestException, ValueError) as e:
+                        # Client errors and malformed payloads will not improve on retry
+                        result["error"] = str(e)
+                    break
+                result["error"] = f"HTTP {r.status_code}"
+
+            if attempt < self.retries:
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                await asyncio.sleep(max(min(delay, deadline - loop.time()), 0))
+
+        result["seconds"] = loop.time() - start
+        return result
+
+    async def fetch_all(self, names=None, urls=None):
+        """
+        Fetch several feeds concurrently (default: all registered).
+        urls optionally overrides the URL per feed name, e.g. for incremental ranges.
+        Returns {feed name: result} as in fetch.
+        """
+        names = list(names) if names is not None else list(self.feeds)
+        urls = urls or {}
+        results = await asyncio.gather(*(self.fetch(name, urls.get(name)) for name in names))
+        return dict(zip(names, results))
+
+    def fetch_all_sync(self, names=None, urls=None):
+        """fetch_all for synchronous callers such as the Streamlit script thread."""
+        start = time.perf_counter()
+        results = asyncio.run(self.fetch_all(names, urls))
+        ok = sum(r["error"] is None for r in results.values())
+        print(f"⚡ Fetched {ok}/{len(results)} price feeds in {time.perf_counter() - start:.2f}s")
+        return results
+
+    def close(self):
+        self.session.close()
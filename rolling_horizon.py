@@ -0,0 +1,153 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+
+from optimizer import optimize_schedule_lp
+
+
+class RollingScheduler:
+    """
+    Keeps an appliance schedule current as 5-minute prices arrive during the day.
+
+    Hours before `now_hour` have already run and stay fixed; each new price
+    interval updates its hour's running average and re-solves only the hours
+    still ahead, for whatever duration each appliance has left. The previous
+    schedule is the starting point: if the changed price cannot alter any
+    appliance's choice of hours the solve is skipped, and a solve that misses
+    latency_budget leaves the previous schedule published until it finishes.
+    """
+
+    def __init__(self, prices, appliances, start_millis, restricted_hours=None,
+                 max_concurrent=None, latency_budget=0.05, on_update=None):
+        self.prices = np.array(prices, dtype=np.float64)
+        self.appliances = appliances
+        self.restricted_hours = set(restricted_hours or [])
+        self.start_millis = int(start_millis)  # UTC millis of hour index 0
+        self.max_concurrent = max_concurrent
+        self.latency_budget = latency_budget
+        self.on_update = on_update
+
+        # Running hourly averages of the 5-minute points seen so far
+        self.interval_sums = np.zeros(len(self.prices))
+        self.interval_counts = np.zeros(len(self.prices), dtype=np.int64)
+
+        self.now_hour = 0
+        self.schedule, self.total_cost = optimize_schedule_lp(
+            self.prices, appliances, sorted(self.restricted_hours), max_concurrent=max_concurrent
+        )
+        self.resolves = 0
+        self.skipped = 0
+        self.last_solve_seconds = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+
+    def add_interval(self, millis_utc, price):
+        """
+        Feed one 5-minute ComEd point ($/kWh). Returns True if the published schedule changed.
+        """
+        hour = int((millis_utc - self.start_millis) // 3_600_000)
+        if not 0 <= hour < len(self.prices):
+            return False
+        self.interval_sums[hour] += price
+        self.interval_counts[hour] += 1
+        return self.update_price(hour, self.interval_sums[hour] / self.interval_counts[hour],
+                                 now_hour=max(self.now_hour, hour))
+
+    def update_price(self, hour, price, now_hour=None):
+        """
+        Set the price of one hour and move the execution point to now_hour,
+        re-solving the remaining hours if needed. Returns True if the schedule changed.
+        """
+        self.prices[hour] = price
+        if now_hour is not None:
+            self.now_hour = max(self.now_hour, now_hour)
+
+        # A pending slow solve from the previous interval takes priority
+        changed = self._collect_pending()
+
+        if hour < self.now_hour or not self._may_change(hour, price):
+            self.skipped += 1
+            return changed
+        return self._resolve() or changed
+
+    def _may_change(self, hour, new_price):
+        """
+        Warm-start check against the previous schedule: without coupling constraints
+        every appliance runs in its cheapest remaining hours, so a price move that
+        keeps the changed hour on the same side of each appliance's cutoff changes nothing.
+        """
+        if self.max_concurrent is not None:
+            return True
+        if hour in self.restricted_hours:
+            return False
+        future = [h for h in range(self.now_hour, len(self.prices)) if h not in self.restricted_hours]
+        for a in self.appliances:
+            chosen = [h for h in self.schedule[a["name"]] if h >= self.now_hour]
+            others = [h for h in future if h not in chosen]
+            if a["power"] == 0 or not chosen or not others:
+                continue
+            if hour in chosen and new_price > min(self.prices[h] for h in others):
+                return True
+            if hour not in chosen and new_price < max(self.prices[h] for h in chosen):
+                return True
+        return False
+
+    def _solve_remaining(self, now_hour):
+        prices = self.prices[now_hour:].copy()
+        remaining = []
+        for a in self.appliances:
+            done = len([h for h in self.schedule[a["name"]] if h < now_hour])
+            remaining.append({**a, "duration": max(a["duration"] - done, 0)})
+        restricted = [h - now_hour for h in self.restricted_hours if h >= now_hour]
+        future, cost = optimize_schedule_lp(prices, remaining, restricted, max_concurrent=self.max_concurrent)
+        return now_hour, future, cost
+
+    def _resolve(self):
+        start = time.perf_counter()
+        future = self._executor.submit(self._solve_remaining, self.now_hour)
+        try:
+            result = future.result(timeout=self.latency_budget)
+        except TimeoutError:
+            # Keep publishing the previous schedule; apply this one when it lands
+            self._pending = future
+            return False
+        self.resolves += 1
+        self.last_solve_seconds = time.perf_counter() - start
+        return self._apply(*result)
+
+    def _collect_pending(self):
+        if self._pending is None or not self._pending.done():
+            return False
+        result = self._pending.result()
+        self._pending = None
+        self.resolves += 1
+        # Hours that ran while the solve was in flight stay as executed
+        if result[0] != self.now_hour:
+            return self._resolve()
+        return self._apply(*result)
+
+    def _apply(self, now_hour, future, cost):
+        if np.isnan(cost):
+            # The coupled re-solve has no feasible schedule: keep publishing the last one
+            print("⚠️ No feasible schedule for the remaining hours, keeping the current one")
+            return False
+        schedule = {}
+        for a in self.appliances:
+            fixed = [h for h in self.schedule[a["name"]] if h < now_hour]
+            schedule[a["name"]] = fixed + [h + now_hour for h in future[a["name"]]]
+        if schedule == self.schedule:
+            return False
+
+        self.schedule = schedule
+        self.total_cost = sum(
+            self.prices[h] * a["power"]
+            for a in self.appliances
+            for h in schedule[a["name"]]
+        )
+        if self.on_update:
+            self.on_update(self.schedule, self.total_cost)
+        return True
+
+    def close(self):
+        self._executor.shutdown(wait=False)
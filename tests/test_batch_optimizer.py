@@ -0,0 +1,13 @@
+import numpy as np
+
+from batch_optimizer import optimize_households
+
+
+def test_infeasible_coupled_household_is_reported():
+    prices = np.linspace(0.02, 0.05, 4)
+    appliances = [{"name": "Washer", "power": 1.0, "duration": 3}, {"name": "Dryer", "power": 1.0, "duration": 3}]
+    households = [{"appliances": appliances}, {"appliances": appliances, "max_concurrent": 1}]
+    schedules, costs, stats = optimize_households(prices, households, n_workers=1)
+    assert np.isfinite(costs[0])
+    assert np.isnan(costs[1]) and schedules[1] == {"Washer": [], "Dryer": []}
+    assert stats["infeasible"] == 1
@@ -0,0 +1,43 @@
+import numpy as np
+
+from generalist_policy import (GENERALIST_PATH, MAX_GAP, evaluate_generalist, objective_gap, sample_problem,
+                               schedule_with_generalist)
+from numpy_policy import NumpyPolicy
+
+
+def test_committed_generalist_stats():
+    stats = evaluate_generalist(NumpyPolicy.load(f"{GENERALIST_PATH}.npz"), num_problems=200, seed=1)
+    # Measured on the committed export: 97% feasible, 25% within MAX_GAP, median gap 0.38
+    # (running everything as early as possible: median gap 1.39)
+    assert stats["feasible_fraction"] >= 0.95
+    assert stats["served_fraction"] >= 0.2
+    assert stats["median_gap"] <= 0.5
+
+
+def test_only_schedules_within_max_gap_are_served():
+    rng = np.random.default_rng(2)
+    served = rejected = 0
+    for _ in range(30):
+        problem = sample_problem(rng)
+        schedule = schedule_with_generalist(*problem)
+        if schedule is None:
+            rejected += schedule_with_generalist(*problem, max_gap=None) is not None
+            continue
+        served += 1
+        assert objective_gap(*problem, schedule) <= MAX_GAP
+    assert served and rejected
+
+
+def test_randomized_env_recompiles_on_reset():
+    from generalist_policy import RandomizedEnergyEnv
+
+    env = RandomizedEnergyEnv(seed=0)
+    for episode in range(5):
+        env.reset()
+        # Fresh appliances (and padding) every episode: the compiled arrays must follow
+        assert env.durations.tolist() == [a["duration"] for a in env.appliances]
+        assert np.flatnonzero(env.restricted_mask).tolist() == sorted(env.restricted_hours)
+        done = False
+        while not done:
+            _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+            done = terminated or truncated
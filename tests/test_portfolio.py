@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import portfolio
+
+PRICES = np.random.default_rng(0).random(24) * 0.1
+APPLIANCES = [{"name": "Washer", "power": 1.0, "duration": 2}]
+
+
+@pytest.fixture(autouse=True)
+def fresh_history():
+    portfolio._run_ms.clear()
+    portfolio._skips.clear()
+    yield
+    portfolio._run_ms.clear()
+    portfolio._skips.clear()
+
+
+def test_slow_run_on_a_large_problem_does_not_skip_small_ones():
+    # One week x 60 appliances took 224 ms; a 24 h, 1-appliance problem is another size class
+    portfolio._run_ms[("exact", portfolio._size_class(168, 60))].extend([224.0] * 5)
+    result = portfolio.optimize(PRICES, APPLIANCES, budget_ms=200, strategies=["exact"])
+    assert "over_budget" not in result["strategies"]["exact"]
+
+
+def test_skipped_strategy_is_probed_again():
+    portfolio._run_ms[("exact", portfolio._size_class(24, 1))].extend([10_000.0] * 5)
+    for _ in range(portfolio.REPROBE_AFTER):
+        result = portfolio.optimize(PRICES, APPLIANCES, budget_ms=200, strategies=["exact"])
+        assert result["strategies"]["exact"]["over_budget"]
+        assert result["strategy"] == "greedy"
+
+    result = portfolio.optimize(PRICES, APPLIANCES, budget_ms=200, strategies=["exact"])
+    assert "over_budget" not in result["strategies"]["exact"]
@@ -0,0 +1,35 @@
+import numpy as np
+
+from price_archive import PriceArchive
+
+
+def test_append_after_torn_write_keeps_rows_aligned(tmp_path):
+    archive = PriceArchive(str(tmp_path))
+    archive.append("comed", [1000, 2000], [0.01, 0.02])
+
+    # Crash between the two writes: the price lands, its timestamp does not
+    ts_path, price_path = archive._paths("comed")
+    with open(price_path, "ab") as f:
+        np.array([0.99], dtype=np.float64).tofile(f)
+    ts, prices = archive.columns("comed")
+    assert ts.tolist() == [1000, 2000]
+
+    assert archive.append("comed", [3000, 4000], [0.03, 0.04]) == 2
+    ts, prices = PriceArchive(str(tmp_path)).columns("comed")
+    assert ts.tolist() == [1000, 2000, 3000, 4000]
+    assert prices.tolist() == [0.01, 0.02, 0.03, 0.04]
+
+
+def test_append_after_partial_row_write(tmp_path):
+    archive = PriceArchive(str(tmp_path))
+    archive.append("comed", [1000], [0.01])
+
+    # Torn mid-value: half a timestamp on disk
+    ts_path, _ = archive._paths("comed")
+    with open(ts_path, "ab") as f:
+        f.write(b"\x01\x02\x03\x04")
+
+    archive.append("comed", [2000], [0.02])
+    ts, prices = PriceArchive(str(tmp_path)).columns("comed")
+    assert ts.tolist() == [1000, 2000]
+    assert prices.tolist() == [0.01, 0.02]
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetch_live_prices import PriceIngester
+from price_feeds import AsyncPriceFetcher, ComEdFeed
+
+PAYLOAD = [{"millisUTC": "1700000000000", "price": "2.5"}, {"millisUTC": "1700000300000", "price": "3.0"}]
+
+
+class StandInServer:
+    """Local stand-in for the ComEd API; `responses` scripts one (status, delay) per request."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests.append((self.path, dict(self.headers)))
+                status, delay = stand_in.responses.pop(0) if stand_in.responses else (200, 0)
+                time.sleep(delay)
+                if status == 304 or (status == 200 and self.headers.get("If-None-Match") == '"v1"'):
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = json.dumps(PAYLOAD).encode() if status == 200 else b"{}"
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up at its deadline
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api?type=5minutefeed"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    stand_in = StandInServer()
+    yield stand_in
+    stand_in.close()
+
+
+def make_fetcher(server, deadline=5.0, name="local", **kwargs):
+    feed = ComEdFeed(name, "5minutefeed", deadline=deadline)
+    feed.url = server.url
+    return AsyncPriceFetcher(feeds={name: feed}, backoff=0.01, **kwargs)
+
+
+def test_conditional_request_across_changing_urls(server):
+    fetcher = make_fetcher(server)
+    first = fetcher.fetch_all_sync(urls={"local": f"{server.url}&dateend=202401010000"})["local"]
+    assert first["error"] is None and not first["not_modified"]
+    assert first["points"] == [(1700000000000, 0.025), (1700000300000, 0.03)]
+
+    # Incremental callers move the date range on every call; the validator still applies
+    second = fetcher.fetch_all_sync(urls={"local": f"{server.url}&dateend=202401010005"})["local"]
+    assert server.requests[1][1].get("If-None-Match") == '"v1"'
+    assert second["not_modified"] and second["error"] is None
+    assert second["points"] == first["points"]
+
+
+def test_retries_with_backoff_on_server_errors(server):
+    server.responses = [(503, 0), (500, 0), (200, 0)]
+    result = make_fetcher(server, retries=3).fetch_all_sync()["local"]
+    assert result["error"] is None
+    assert result["attempts"] == 3
+    assert len(result["points"]) == 2
+
+
+def test_gives_up_after_retries(server):
+    server.responses = [(503, 0)] * 3
+    result = make_fetcher(server, retries=2).fetch_all_sync()["local"]
+    assert result["error"] == "HTTP 503"
+    assert result["attempts"] == 3
+
+
+def test_deadline_bounds_a_slow_feed(server):
+    server.responses = [(200, 2.0)]
+    start = time.perf_counter()
+    result = make_fetcher(server, deadline=0.3).fetch_all_sync()["local"]
+    assert time.perf_counter() - start < 1.5
+    assert result["error"] is not None
+    assert result["points"] == []
+
+
+def test_ingester_refresh_goes_through_the_fetcher(server, tmp_path):
+    ingester = PriceIngester(state_path=str(tmp_path / "state.json"), url=server.url)
+    fetcher = make_fetcher(server, name="comed_5min")
+
+    server.responses = [(503, 0), (200, 0)]
+    assert ingester.refresh(fetcher) == [(1700000000000, 0.025), (1700000300000, 0.03)]
+    assert len(server.requests) == 2
+
+    # The next refresh asks for the tail only and folds in nothing already seen
+    assert ingester.refresh(fetcher) == []
+    assert "datestart=" in server.requests[2][0]
+
+    server.responses = [(503, 0)] * 4
+    with pytest.raises(RuntimeError):
+        ingester.refresh(fetcher)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from rolling_horizon import RollingScheduler
+
+START = 1_700_000_000_000
+
+
+def test_add_interval_places_points_by_start_millis():
+    prices = np.array([0.05, 0.05, 0.05, 0.05, 0.05, 0.04])
+    appliances = [{"name": "Washer", "power": 1.0, "duration": 1}]
+    scheduler = RollingScheduler(prices, appliances, START)
+    try:
+        assert scheduler.schedule == {"Washer": [5]}
+        # Hour 3 gets cheap over two 5-minute points; points before hour 0 are ignored
+        assert not scheduler.add_interval(START - 300_000, 0.0)
+        assert scheduler.add_interval(START + 3 * 3_600_000, 0.01)
+        scheduler.add_interval(START + 3 * 3_600_000 + 300_000, 0.03)
+        assert scheduler.prices[3] == 0.02 and scheduler.now_hour == 3
+        assert scheduler.schedule == {"Washer": [3]}
+    finally:
+        scheduler.close()
+
+
+def test_infeasible_solve_is_never_published():
+    prices = np.array([0.05, 0.04, 0.03, 0.05])
+    appliances = [{"name": "Washer", "power": 1.0, "duration": 3}, {"name": "Dryer", "power": 1.0, "duration": 3}]
+    updates = []
+    scheduler = RollingScheduler(prices, appliances, START, max_concurrent=1,
+                                 on_update=lambda schedule, cost: updates.append(cost))
+    try:
+        # Six appliance-hours, one at a time, in four hours
+        assert np.isnan(scheduler.total_cost)
+        assert not scheduler.update_price(2, 0.01)
+
+        published = {"Washer": [0, 1, 2], "Dryer": []}
+        scheduler.schedule = dict(published)
+        assert not scheduler._apply(1, {"Washer": [], "Dryer": []}, float("nan"))
+        assert scheduler.schedule == published
+        assert updates == []
+    finally:
+        scheduler.close()
@@ -0,0 +1,43 @@
+import json
+import multiprocessing as mp
+
+from utils.tracing import Tracer
+
+
+def _emit(path, n):
+    # Runs in a forked child that inherits the parent's tracer state
+    tracer = _shared
+    for i in range(n):
+        with tracer.span("lp_job", root=True, i=i):
+            with tracer.span("lp_solve"):
+                pass
+
+
+_shared = None
+
+
+def test_forked_workers_do_not_reuse_trace_ids(tmp_path):
+    global _shared
+    path = str(tmp_path / "traces.jsonl")
+    _shared = Tracer(export_path=path, max_export_bytes=4096)
+    with _shared.span("optimize_request", root=True):
+        pass
+
+    ctx = mp.get_context("fork")
+    workers = [ctx.Process(target=_emit, args=(path, 50)) for _ in range(3)]
+    for w in workers:
+        w.start()
+    _emit(path, 50)
+    for w in workers:
+        w.join()
+
+    spans = []
+    for name in (f"{path}.1", path):
+        with open(name) as f:
+            spans += [json.loads(line) for line in f]  # no torn or interleaved lines
+    roots = [s for s in spans if s["parent_id"] is None]
+    assert len({s["trace_id"] for s in roots}) == len(roots)
+    assert len({s["span_id"] for s in spans}) == len(spans)
+    children = [s for s in spans if s["parent_id"] is not None]
+    by_id = {s["span_id"]: s for s in spans}
+    assert all(by_id[s["parent_id"]]["trace_id"] == s["trace_id"] for s in children if s["parent_id"] in by_id)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from vec_energy_env import ParallelVecEnergyEnv, VecEnergyEnvWithPreferences
+
+PRICES = np.linspace(0.02, 0.1, 24)
+APPLIANCES = [{"name": "Washer", "power": 1.0, "duration": 2}]
+
+
+@pytest.fixture
+def env():
+    env = ParallelVecEnergyEnv(VecEnergyEnvWithPreferences, (PRICES, APPLIANCES, [0], {}),
+                               num_envs=5, n_workers=2, start_method="fork")
+    yield env
+    env.close()
+
+
+def test_set_attr_reaches_workers(env):
+    # Episodes 0-2 live on the first worker, 3-4 on the second
+    env.set_attr("unscheduled_penalty", 7.0, indices=[0, 1, 2])
+    assert env.get_attr("unscheduled_penalty") == [7.0, 7.0, 7.0, 50.0, 50.0]
+    assert env.get_attr("num_envs", indices=[4, 0]) == [2, 3]
+
+    with pytest.raises(ValueError):
+        env.set_attr("restricted_penalty", 1.0, indices=[0])
+
+
+def test_env_method_runs_in_workers(env):
+    env.reset()
+    env.step(np.ones((5, 1)))
+    obs = env.env_method("_get_obs", indices=[3, 0])
+    assert [o.shape for o in obs] == [(2, 2), (3, 2)]
+    assert all((o[:, 0] == 1 / 24).all() for o in obs)
@@ -1,74 +1,64 @@
 import numpy as np
 from stable_baselines3 import PPO
-from stable_baselines3.common.env_checker import check_env
 from energy_env import EnergyEnv
+from optimizer import format_schedule_readable
+from utils.time_slots import horizon_timesteps
+from vec_energy_env import VecEnergyEnv, learn_and_report, make_training_env
 
 
-def train_agent(prices, appliances, restricted_hours):
+def train_agent(prices, appliances, restricted_hours, n_envs=8, n_workers=1, seed=None, slot_minutes=60):
     """
     Train the PPO reinforcement learning agent using the given price data and restricted hours.
+    slot_minutes is the length of one price slot (hourly by default).
     """
-    env = EnergyEnv(prices, appliances, restricted_hours)
-    check_env(env, warn=True)
+    env, n_envs = make_training_env(EnergyEnv, VecEnergyEnv, (prices, appliances, restricted_hours),
+                                    n_envs, n_workers, seed, slot_minutes)
 
     # Improved hyperparameters for better learning
     model = PPO(
         "MlpPolicy", 
         env, 
         learning_rate=0.0003,
-        n_steps=2048,
+        n_steps=max(2048 // n_envs, 1),
         batch_size=64,
         n_epochs=10,
         gamma=0.99,
+        seed=seed,
         verbose=0
     )
     
     # More timesteps for better learning
-    model.learn(total_timesteps=50000)
+    learn_and_report(model, env, horizon_timesteps(50000, len(prices)), n_workers)
     model.save("models/energy_agent")
 
     return model
 
 
-def run_agent(model, prices, appliances, restricted_hours):
+def run_agent(model, prices, appliances, restricted_hours, slot_minutes=60):
     """
     Run the trained model to generate an optimized schedule.
+    For many problems at once use batch_rollout.rollout_scenarios with env_cls=EnergyEnv.
     """
-    env = EnergyEnv(prices, appliances, restricted_hours)
+    env = EnergyEnv(prices, appliances, restricted_hours, slot_minutes=slot_minutes)
     obs, _ = env.reset()
     done = False
 
     schedule = {a["name"]: [] for a in appliances}
 
     while not done:
-        # Record the hour and remaining durations BEFORE stepping
+        # Record the hour and which appliances still had duration left BEFORE stepping
         current_hour = env.current_hour
-        remaining_before_step = {a["name"]: env.remaining_durations[a["name"]] for a in appliances}
-        
+        pending = env.remaining_durations > 0
+
         action, _ = model.predict(obs, deterministic=True)
         obs, reward, done, _, info = env.step(action)
 
-        # Only record if appliance had remaining duration before the step
+        # Nothing runs in a restricted hour, whatever the policy asked for
+        if env.restricted_mask[current_hour]:
+            continue
         for i, a in enumerate(appliances):
-            if action[i] == 1 and remaining_before_step[a["name"]] > 0:
+            if action[i] == 1 and pending[i]:
                 schedule[a["name"]].append(current_hour)
 
-    # Format hours into human-readable ranges
-    readable_schedule = {}
-    for name, hours in schedule.items():
-        if not hours:
-            readable_schedule[name] = "Not scheduled"
-            continue
-
-        hours = sorted(set(hours))
-        ranges = []
-        start = prev = hours[0]
-        for h in hours[1:]:
-            if h != prev + 1:
-                ranges.append(f"{start}:00–{prev+1}:00")
-                start = h
-            prev = h
-        ranges.append(f"{start}:00–{prev+1}:00")
-        readable_schedule[name] = ", ".join(ranges)
-
-    return readable_schedule
\ No newline at end of file
+    # Format slots into human-readable ranges
+    return format_schedule_readable(schedule, appliances, slot_minutes)
\ No newline at end of file
@@ -1,111 +1,248 @@
+import glob
+import json
+import os
+import zipfile
+
 import numpy as np
 from stable_baselines3 import PPO
-from stable_baselines3.common.env_checker import check_env
+from stable_baselines3.common.callbacks import BaseCallback, CallbackList
 from energy_env_with_preferences import EnergyEnvWithPreferences
+from exact_solver import optimize_schedule_exact, schedule_objective
+from optimizer import optimize_schedule_lp
+from utils.comfort_score import calculate_comfort_score  # re-exported: older callers import it from here
+from vec_energy_env import VecEnergyEnvWithPreferences, learn_and_report, make_training_env
+from utils.time_slots import duration_slots, horizon_timesteps
+from utils.tracing import span, traced
+
+# Shipped checkpoints, tried before cached policies when warm-starting
+CHECKPOINT_PATHS = ["models/energy_agent_preferences.zip", "models/energy_agent.zip"]
+CACHED_CHECKPOINT_GLOB = "models/cache/*.zip"
+
+
+def _checkpoint_shapes(path):
+    """Read observation/action shapes from a saved model without loading its weights."""
+    with zipfile.ZipFile(path) as archive:
+        data = json.loads(archive.read("data"))
+    return tuple(data["observation_space"]["_shape"]), tuple(data["action_space"]["_shape"])
 
 
-def train_agent_with_preferences(prices, appliances, restricted_hours, preferences):
+def find_compatible_checkpoint(observation_space, action_space, search_paths=None):
+    """
+    Return the nearest saved model whose observation and action shapes match, or None.
+    Shipped checkpoints are preferred, then cached policies newest first.
+    """
+    if search_paths is None:
+        cached = sorted(glob.glob(CACHED_CHECKPOINT_GLOB), key=os.path.getmtime, reverse=True)
+        search_paths = CHECKPOINT_PATHS + cached
+
+    wanted = (tuple(observation_space.shape), tuple(action_space.shape))
+    for path in search_paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            if _checkpoint_shapes(path) == wanted:
+                return path
+        except (KeyError, ValueError, zipfile.BadZipFile):
+            continue
+    return None
+
+
+class ProgressCallback(BaseCallback):
+    """Reports training progress (0..1) to progress(fraction) at most once per percent."""
+
+    def __init__(self, progress, total_timesteps):
+        super().__init__()
+        self.progress = progress
+        self.total_timesteps = max(total_timesteps, 1)
+        self._last = -1
+
+    def _on_step(self):
+        percent = min(100 * self.model.num_timesteps // self.total_timesteps, 100)
+        if percent != self._last:
+            self._last = percent
+            self.progress(percent / 100)
+        return True
+
+
+class ConvergenceCallback(BaseCallback):
+    """
+    Early stopping once the greedy policy has converged.
+
+    Every check_freq timesteps (at the start of a rollout, right after a
+    policy update) the deterministic policy schedules the problem once. Training
+    stops when that schedule is feasible (every duration met, no restricted
+    hour used), unchanged for `patience` consecutive checks, and within max_gap
+    of the LP bound. The gap is taken on the objective the policy is trained
+    on (energy + comfort + concurrency, bounded by optimize_schedule_exact)
+    relative to the larger of that bound and the optimize_schedule_lp energy
+    cost, so without preferences it is the plain excess over the LP cost, and
+    preferences that shift the schedule to dearer hours do not count against
+    convergence.
+    """
+
+    def __init__(self, prices, appliances, restricted_hours, preferences, check_freq=2048, max_gap=0.15,
+                 patience=3, slot_minutes=60, verbose=1):
+        super().__init__(verbose)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.appliances = appliances
+        self.restricted_hours = restricted_hours or []
+        self.preferences = preferences
+        self.check_freq = check_freq
+        self.max_gap = max_gap
+        self.patience = patience
+        self.slot_minutes = slot_minutes
+        _, self.lp_cost = optimize_schedule_lp(self.prices, appliances, self.restricted_hours,
+                                               slot_minutes=slot_minutes)
+        _, self.bound = optimize_schedule_exact(self.prices, appliances, self.restricted_hours, preferences,
+                                                unscheduled_penalty=EnergyEnvWithPreferences.unscheduled_penalty,
+                                                slot_minutes=slot_minutes)
+
+        self.last_check = 0
+        self.last_schedule = None
+        self.stable_checks = 0
+        self.converged = False
+        self.gap = None
+        self.timesteps_saved = 0
+
+    def _is_feasible(self, schedule):
+        restricted = set(self.restricted_hours)
+        return all(
+            len(set(schedule[a["name"]])) == duration_slots(a["duration"], self.slot_minutes)
+            and not restricted.intersection(schedule[a["name"]])
+            for a in self.appliances
+        )
+
+    def _check(self):
+        schedule = run_agent_with_preferences(
+            self.model, self.prices, self.appliances, self.restricted_hours, self.preferences,
+            slot_minutes=self.slot_minutes
+        )
+        if not self._is_feasible(schedule):
+            self.last_schedule, self.stable_checks = None, 0
+            return False
+
+        objective = schedule_objective(self.prices, self.appliances, schedule, self.preferences,
+                                       unscheduled_penalty=EnergyEnvWithPreferences.unscheduled_penalty,
+                                       slot_minutes=self.slot_minutes)
+        excess = max(objective - self.bound, 0.0)
+        scale = max(abs(self.bound), abs(self.lp_cost))
+        self.gap = excess / scale if scale else excess
+        self.stable_checks = self.stable_checks + 1 if schedule == self.last_schedule else 1
+        self.last_schedule = schedule
+        return self.stable_checks >= self.patience and self.gap <= self.max_gap
+
+    def _on_rollout_start(self):
+        if self.converged or self.num_timesteps - self.last_check < self.check_freq:
+            return
+        self.last_check = self.num_timesteps
+        self.converged = self._check()
+
+    def _on_step(self):
+        # Returning False ends model.learn
+        return not self.converged
+
+    def _on_training_end(self):
+        if not self.converged:
+            return
+        self.timesteps_saved = max(self.model._total_timesteps - self.num_timesteps, 0)
+        if self.verbose:
+            print(f"⏹️ Converged after {self.num_timesteps} timesteps (gap {self.gap:.1%} to the LP bound), "
+                  f"saved {self.timesteps_saved} timesteps")
+
+
+@traced()
+def train_agent_with_preferences(prices, appliances, restricted_hours, preferences, n_envs=8, n_workers=1, seed=None,
+                                 save_path="models/energy_agent_preferences", warm_start=False,
+                                 fine_tune_timesteps=10000, slot_minutes=60, progress=None,
+                                 early_stopping=True, max_gap=0.15):
     """
     Train RL agent that balances cost + user comfort preferences.
+    With warm_start, fine-tunes the nearest compatible checkpoint instead of
+    training from scratch: with early_stopping until it converges, up to the
+    from-scratch budget, otherwise for fine_tune_timesteps.
+    slot_minutes is the length of one price slot (hourly by default).
+    progress, if given, is called with the fraction of timesteps done.
+    With early_stopping, training ends once the greedy schedule is feasible,
+    stable and within max_gap of the LP cost (see ConvergenceCallback);
+    model.timesteps_saved reports the unused budget.
     """
-    env = EnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences)
-    check_env(env, warn=True)
-
-    # Improved hyperparameters
-    model = PPO(
-        "MlpPolicy",
-        env,
-        learning_rate=0.0003,
-        n_steps=2048,
-        batch_size=64,
-        n_epochs=10,
-        gamma=0.99,
-        verbose=0
-    )
-
-    # Train the model with more timesteps to ensure proper learning
-    model.learn(total_timesteps=100000)
-    model.save("models/energy_agent_preferences")
+    env, n_envs = make_training_env(EnergyEnvWithPreferences, VecEnergyEnvWithPreferences,
+                                    (prices, appliances, restricted_hours, preferences),
+                                    n_envs, n_workers, seed, slot_minutes)
+
+    # Train with more timesteps to ensure proper learning
+    # (scaled up sub-linearly for multi-day horizons)
+    total_timesteps = horizon_timesteps(100000, len(prices))
+
+    checkpoint = find_compatible_checkpoint(env.observation_space, env.action_space) if warm_start else None
+    if checkpoint:
+        print(f"♻️ Warm-starting from {checkpoint}")
+        model = PPO.load(checkpoint, env=env, n_steps=max(2048 // n_envs, 1), seed=seed)
+        # A checkpoint trained on another problem is only a starting point: without
+        # the convergence check there is no sign it fits this one
+        if not early_stopping:
+            total_timesteps = fine_tune_timesteps
+    else:
+        # Improved hyperparameters
+        model = PPO(
+            "MlpPolicy",
+            env,
+            learning_rate=0.0003,
+            n_steps=max(2048 // n_envs, 1),
+            batch_size=64,
+            n_epochs=10,
+            gamma=0.99,
+            seed=seed,
+            verbose=0
+        )
+
+    callbacks = []
+    if progress:
+        callbacks.append(ProgressCallback(progress, total_timesteps))
+    convergence = None
+    if early_stopping:
+        convergence = ConvergenceCallback(prices, appliances, restricted_hours, preferences,
+                                          max_gap=max_gap, slot_minutes=slot_minutes)
+        callbacks.append(convergence)
+
+    with span("ppo_learn", timesteps=total_timesteps, warm_start=bool(checkpoint)):
+        learn_and_report(model, env, total_timesteps, n_workers, callback=CallbackList(callbacks))
+    model.timesteps_saved = convergence.timesteps_saved if convergence else 0
+    if progress:
+        progress(1.0)
+
+    if save_path:
+        model.save(save_path)
 
     return model
 
 
-def run_agent_with_preferences(model, prices, appliances, restricted_hours, preferences):
+@traced("rollout")
+def run_agent_with_preferences(model, prices, appliances, restricted_hours, preferences, **env_kwargs):
     """
     Run trained model to generate preference-aware schedule.
+    env_kwargs (e.g. obs_mode, max_appliances, slot_minutes) must match how the model was trained.
+    For many problems at once use batch_rollout.rollout_scenarios.
     """
-    env = EnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences)
+    env = EnergyEnvWithPreferences(prices, appliances, restricted_hours, preferences, **env_kwargs)
     obs, _ = env.reset()
     done = False
 
     schedule = {a["name"]: [] for a in appliances}
 
     while not done:
-        # Record the hour and remaining durations BEFORE stepping
+        # Record the hour and which appliances still had duration left BEFORE stepping
         current_hour = env.current_hour
-        remaining_before_step = {a["name"]: env.remaining_durations[a["name"]] for a in appliances}
-        
+        pending = env.remaining_durations > 0
+
         action, _ = model.predict(obs, deterministic=True)
         obs, reward, done, _, info = env.step(action)
 
-        # Only record if appliance had remaining duration before the step
+        # Nothing runs in a restricted hour, whatever the policy asked for
+        if env.restricted_mask[current_hour]:
+            continue
         for i, a in enumerate(appliances):
-            if action[i] == 1 and remaining_before_step[a["name"]] > 0:
+            if action[i] == 1 and pending[i]:
                 schedule[a["name"]].append(current_hour)
 
     return schedule
-
-def calculate_comfort_score(schedule, preferences):
-
-    total_score = 0
-    total_possible = 0
-
-    for appliance_name, pref in preferences.items():
-        if appliance_name not in schedule:
-            continue
-
-        hours = schedule[appliance_name]
-
-        # If appliance is not scheduled at all, this is a major failure - return very low score
-        if not hours or len(hours) == 0:
-            return 0.5  # Low score but never exactly 0 (constraint: score must be in range (0, 10))
-
-        avoid_hours = pref.get("avoid_hours", [])
-        preferred_hours = pref.get("preferred_hours", [])
-        # Get the preference strength from user settings (app.py uses 'preferred_bonus')
-        prefer_bonus = pref.get("preferred_bonus", pref.get("preference_strength", 3))
-
-        # weightings
-        avoid_penalty = 3 * prefer_bonus      # heavy penalty for violating avoids
-        prefer_reward = 4 * prefer_bonus      # reward for following preferences
-        neutral_reward = 0.5                  # small baseline
-        completion_bonus = 2 * prefer_bonus   # extra if all required hours are satisfied
-
-        score = 0
-        for hour in hours:
-            if hour in avoid_hours:
-                score -= avoid_penalty
-            elif hour in preferred_hours:
-                score += prefer_reward
-            else:
-                score += neutral_reward
-
-        # full satisfaction bonus (no avoids, all in preferred if possible)
-        # Only award if hours is not empty AND conditions are met
-        if len(hours) > 0 and all(h in preferred_hours for h in hours) and not any(h in avoid_hours for h in hours):
-            score += completion_bonus
-
-        total_score += max(score, 0)  # no negative totals
-        total_possible += len(hours) * prefer_reward + completion_bonus
-
-    # normalize to 0–10
-    if total_possible == 0:
-        return 0.5  # Avoid returning exactly 0, which violates the constraint
-
-    normalized = (total_score / total_possible) * 10
-
-    # Ensure score is NEVER exactly 0 or 10
-    # Cap at 9.9 to ensure when displayed with .1f format, it won't round to 10.0
-    # Clamp to range (0.1, 9.9) to strictly exclude 0 and 10
-    clamped = max(0.1, min(9.9, normalized))
-    return round(clamped, 2)
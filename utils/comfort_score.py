@@ -0,0 +1,54 @@
+def calculate_comfort_score(schedule, preferences):
+    """0-10 comfort rating of a schedule against the user's preferences, as shown in the app."""
+    total_score = 0
+    total_possible = 0
+
+    for appliance_name, pref in preferences.items():
+        if appliance_name not in schedule:
+            continue
+
+        hours = schedule[appliance_name]
+
+        # If appliance is not scheduled at all, this is a major failure - return very low score
+        if not hours or len(hours) == 0:
+            return 0.5  # Low score but never exactly 0 (constraint: score must be in range (0, 10))
+
+        avoid_hours = pref.get("avoid_hours", [])
+        preferred_hours = pref.get("preferred_hours", [])
+        # Get the preference strength from user settings (app.py uses 'preferred_bonus')
+        prefer_bonus = pref.get("preferred_bonus", pref.get("preference_strength", 3))
+
+        # weightings
+        avoid_penalty = 3 * prefer_bonus      # heavy penalty for violating avoids
+        prefer_reward = 4 * prefer_bonus      # reward for following preferences
+        neutral_reward = 0.5                  # small baseline
+        completion_bonus = 2 * prefer_bonus   # extra if all required hours are satisfied
+
+        score = 0
+        for hour in hours:
+            if hour in avoid_hours:
+                score -= avoid_penalty
+            elif hour in preferred_hours:
+                score += prefer_reward
+            else:
+                score += neutral_reward
+
+        # full satisfaction bonus (no avoids, all in preferred if possible)
+        # Only award if hours is not empty AND conditions are met
+        if len(hours) > 0 and all(h in preferred_hours for h in hours) and not any(h in avoid_hours for h in hours):
+            score += completion_bonus
+
+        total_score += max(score, 0)  # no negative totals
+        total_possible += len(hours) * prefer_reward + completion_bonus
+
+    # normalize to 0–10
+    if total_possible == 0:
+        return 0.5  # Avoid returning exactly 0, which violates the constraint
+
+    normalized = (total_score / total_possible) * 10
+
+    # Ensure score is NEVER exactly 0 or 10
+    # Cap at 9.9 to ensure when displayed with .1f format, it won't round to 10.0
+    # Clamp to range (0.1, 9.9) to strictly exclude 0 and 10
+    clamped = max(0.1, min(9.9, normalized))
+    return round(clamped, 2)
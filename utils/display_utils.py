@@ -1,8 +1,10 @@
 import pandas as pd
 
-def format_schedule_readable(schedule, appliances):
+from utils.time_slots import slot_label
+
+def format_schedule_readable(schedule, appliances, slot_minutes=60):
     """
-    Convert schedule dictionary of appliance-hour mappings into a human-readable form.
+    Convert schedule dictionary of appliance-slot mappings into a human-readable form.
     """
     readable = {}
 
@@ -14,8 +16,8 @@ def format_schedule_readable(schedule, appliances):
         readable_hours = []
         for h in hours:
             try:
-                hour = int(float(h))  # safely cast string or float to int
-                readable_hours.append(f"{hour:02d}:00–{hour+1:02d}:00")
+                slot = int(float(h))  # safely cast string or float to int
+                readable_hours.append(f"{slot_label(slot, slot_minutes):0>5}–{slot_label(slot + 1, slot_minutes):0>5}")
             except Exception as e:
                 print(f"Skipping invalid hour '{h}' for {appliance}: {e}")
 
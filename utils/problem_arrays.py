@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def restricted_mask(restricted_hours, num_hours):
+    """Boolean per-slot flag, True where running is not allowed; out-of-range hours are ignored."""
+    mask = np.zeros(num_hours, dtype=bool)
+    hours = np.array([h for h in restricted_hours or [] if 0 <= h < num_hours], dtype=np.int64)
+    mask[hours] = True
+    return mask
+
+
+def comfort_matrix(appliances, num_hours, preferences):
+    """
+    (appliances x hours) comfort penalty: avoid_penalty (default 2.0) in
+    avoided hours, minus preferred_bonus (default 1.0) in preferred ones.
+    The envs, the vec envs and the solvers all price comfort with this.
+    """
+    comfort = np.zeros((len(appliances), num_hours), dtype=np.float64)
+    for i, a in enumerate(appliances):
+        pref = (preferences or {}).get(a["name"])
+        if not pref:
+            continue
+        for h in set(pref.get("avoid_hours", [])):
+            if 0 <= h < num_hours:
+                comfort[i, h] += pref.get("avoid_penalty", 2.0)
+        for h in set(pref.get("preferred_hours", [])):
+            if 0 <= h < num_hours:
+                comfort[i, h] -= pref.get("preferred_bonus", 1.0)
+    return comfort
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+
+def slot_hours(slot_minutes=60):
+    """Length of one scheduling slot in hours (e.g. 0.25 for 15-minute slots)."""
+    if slot_minutes <= 0 or 60 % slot_minutes:
+        raise ValueError(f"slot_minutes must divide an hour, got {slot_minutes}")
+    return slot_minutes / 60.0
+
+
+def duration_slots(duration, slot_minutes=60):
+    """Appliance duration (hours) as a whole number of slots."""
+    return max(int(round(duration / slot_hours(slot_minutes))), 0)
+
+
+def slot_label(slot, slot_minutes=60):
+    """Clock time at the start of a slot, e.g. 30 -> "7:30" for 15-minute slots."""
+    minutes = slot * slot_minutes
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def label_after(label, minutes):
+    """
+    A price-table time label ("03:00 PM", or "Tue 03:00 PM" on multi-day
+    horizons) moved `minutes` later, in the same format.
+    """
+    parts = label.split()
+    start = datetime.strptime(" ".join(parts[-2:]), "%I:%M %p")
+    end = start + timedelta(minutes=minutes)
+    text = end.strftime("%I:%M %p")
+    if len(parts) == 3:
+        day = (WEEKDAYS.index(parts[0]) + (end - start.replace(hour=0, minute=0)).days) % 7
+        text = f"{WEEKDAYS[day]} {text}"
+    return text
+
+
+MAX_HORIZON_HOURS = 168  # one week
+
+
+def horizon_timesteps(base_timesteps, num_steps, reference_steps=24):
+    """
+    PPO budget for an episode of num_steps. Longer horizons mean longer
+    episodes, but the observation size does not grow with the horizon, so the
+    budget grows with the square root of episode length: a 168-step week
+    trains ~2.6x the 24-step budget rather than 7x.
+    """
+    return int(base_timesteps * max(1.0, (num_steps / reference_steps) ** 0.5))
@@ -0,0 +1,157 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: exports from several processes are not serialized
+    fcntl = None
+
+TRACE_PATH = "data/traces.jsonl"
+MAX_EXPORT_BYTES = 5 * 2**20  # traces.jsonl rotates to traces.jsonl.1 past this size
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes():
+    """Current resident set size, or 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class Tracer:
+    """
+    Lightweight nested timing spans for the hot path.
+
+    Each span records its wall time (and, with memory=True, the change in
+    resident memory) and knows its parent, so one "Optimize Schedule" click
+    becomes a tree (LP build/solve -> PPO training -> rollout). Only
+    request-level spans (root=True) start a trace; any other span outside a
+    trace is a no-op, so library callers such as batch or rolling-horizon
+    solves pay nothing. The current span lives in a context variable, so
+    nesting follows threads and asyncio tasks. Span and trace ids are random
+    (uuid4), so traces from forked job workers never collide with the app's.
+    Finished spans are kept in memory for the timing panel and, when
+    export_path is set, each finished trace is appended as JSON lines,
+    rotating past max_export_bytes.
+    """
+
+    def __init__(self, export_path=None, max_spans=10000, memory=False, max_export_bytes=MAX_EXPORT_BYTES):
+        self.export_path = export_path
+        self.memory = memory
+        self.max_export_bytes = max_export_bytes
+        self.spans = deque(maxlen=max_spans)
+        self._current = contextvars.ContextVar("current_span", default=None)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, root=False, **attrs):
+        """
+        Time a block as a child of the current span. root=True starts a new
+        trace when there is none; otherwise a span outside a trace records
+        nothing and yields None.
+        """
+        parent = self._current.get()
+        if parent is None and not root:
+            yield None
+            return
+        record = {
+            "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": parent["span_id"] if parent else None,
+            "name": name,
+            "depth": parent["depth"] + 1 if parent else 0,
+            "start": time.time(),
+            "attrs": attrs,
+        }
+        token = self._current.set(record)
+        rss_start = _rss_bytes() if self.memory else 0
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["duration_ms"] = (time.perf_counter() - start) * 1000
+            if self.memory:
+                record["rss_delta_bytes"] = _rss_bytes() - rss_start
+            self._current.reset(token)
+            with self._lock:
+                self.spans.append(record)
+            if parent is None and self.export_path:
+                self.export_jsonl(self.export_path, self.trace(record["trace_id"]))
+
+    @contextmanager
+    def resume(self, record):
+        """
+        Spans in this block become children of `record`, a span that already
+        finished (e.g. a request root whose later stages run elsewhere).
+        With record=None they are untraced.
+        """
+        token = self._current.set(record)
+        try:
+            yield record
+        finally:
+            self._current.reset(token)
+
+    def traced(self, name=None, root=False):
+        """Decorator form of span, named after the function by default."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not root and self._current.get() is None:
+                    return fn(*args, **kwargs)
+                with self.span(name or fn.__name__, root=root):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def trace(self, trace_id):
+        """Spans of one trace in start order."""
+        with self._lock:
+            spans = [s for s in self.spans if s["trace_id"] == trace_id]
+        return sorted(spans, key=lambda s: (s["start"], s["depth"]))
+
+    def last_trace(self, name=None):
+        """Spans of the most recent finished root span (optionally with this name)."""
+        with self._lock:
+            roots = [s for s in self.spans if s["parent_id"] is None and (name is None or s["name"] == name)]
+        return self.trace(roots[-1]["trace_id"]) if roots else []
+
+    def export_jsonl(self, path, spans=None):
+        """
+        Append spans (default: all kept spans) to a JSON-lines file. A file
+        past max_export_bytes is first moved to path.1, replacing the previous one.
+        The app and its job workers share the file, so rotation and the append
+        happen under an exclusive lock on path.lock, and each trace is written
+        in one call.
+        """
+        spans = list(self.spans) if spans is None else spans
+        lines = "".join(json.dumps(s, default=str) + "\n" for s in spans)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.getsize(path) > self.max_export_bytes:
+                    os.replace(path, f"{path}.1")
+            except OSError:
+                pass
+            with open(path, "a") as f:
+                f.write(lines)
+
+
+tracer = Tracer(export_path=os.environ.get("WATTYOUSAVE_TRACE"),
+                memory=os.environ.get("WATTYOUSAVE_TRACE_MEMORY", "") not in ("", "0"))
+span = tracer.span
+traced = tracer.traced
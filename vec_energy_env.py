@@ -0,0 +1,341 @@
+import multiprocessing as mp
+import time
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from utils.problem_arrays import comfort_matrix, restricted_mask
+from utils.time_slots import duration_slots, slot_hours
+
+
+class VecEnergyEnv(VecEnv):
+    """
+    Batched version of EnergyEnv for stable-baselines3.
+    Holds the state of many episodes as (episodes x appliances) arrays and
+    advances all of them with one set of array operations per step.
+    Rewards match EnergyEnv exactly.
+    """
+
+    restricted_penalty = 5.0
+    unscheduled_penalty = 10.0
+    render_mode = None
+
+    def __init__(self, prices, appliances, restricted_hours=None, num_envs=8, slot_minutes=60):
+        self.prices = np.array(prices, dtype=np.float64)
+        self.appliances = appliances
+        self.restricted_hours = restricted_hours or []
+        self.slot_minutes = slot_minutes
+        self.slot_hours = slot_hours(slot_minutes)
+
+        self.num_hours = len(prices)
+        self.num_appliances = len(appliances)
+
+        observation_space = spaces.Box(
+            low=0, high=1, shape=(1 + self.num_appliances,), dtype=np.float32
+        )
+        action_space = spaces.MultiBinary(self.num_appliances)
+        super().__init__(num_envs, observation_space, action_space)
+
+        # Problem data compiled once: per-hour restriction flag and
+        # (appliances x hours) cost of running each appliance in each hour
+        self.durations = np.array([duration_slots(a["duration"], slot_minutes) for a in appliances], dtype=np.int64)
+        power = np.array([a["power"] for a in appliances], dtype=np.float64)
+        self.restricted_mask = restricted_mask(self.restricted_hours, self.num_hours)
+        self.hourly_cost = (np.outer(power, self.prices) + self._comfort_matrix()) * self.slot_hours
+
+        # Per-episode state
+        self.current_hour = np.zeros(num_envs, dtype=np.int64)
+        self.remaining_durations = np.tile(self.durations, (num_envs, 1))
+        self.actions = np.zeros((num_envs, self.num_appliances), dtype=np.int64)
+
+    def _comfort_matrix(self):
+        return np.zeros((self.num_appliances, self.num_hours), dtype=np.float64)
+
+    def _get_obs(self):
+        obs = np.empty((self.num_envs, 1 + self.num_appliances), dtype=np.float32)
+        obs[:, 0] = self.current_hour / self.num_hours
+        obs[:, 1:] = self.remaining_durations > 0
+        return obs
+
+    def reset(self):
+        self.current_hour[:] = 0
+        self.remaining_durations[:] = self.durations
+        self._reset_seeds()
+        self._reset_options()
+        return self._get_obs()
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions).reshape(self.num_envs, self.num_appliances)
+
+    def step_wait(self):
+        action = self.actions == 1
+        hour = self.current_hour
+        restricted = self.restricted_mask[hour]
+
+        # Restricted hour → penalize any attempted usage, no progress
+        rewards = np.where(restricted, -self.restricted_penalty * self.slot_hours * action.sum(axis=1), 0.0)
+
+        # Energy cost (plus comfort) of appliances that actually run
+        active = action & (self.remaining_durations > 0) & ~restricted[:, None]
+        rewards -= (active * self.hourly_cost[:, hour].T).sum(axis=1)
+
+        # Penalty for too many concurrent appliances (realistic load)
+        active_appliances = active.sum(axis=1)
+        rewards -= 0.5 * self.slot_hours * np.maximum(active_appliances - 2, 0)
+
+        self.remaining_durations -= active
+        self.current_hour += 1
+
+        all_done = (self.remaining_durations <= 0).all(axis=1)
+        dones = (self.current_hour >= self.num_hours) | (all_done & ~restricted)
+
+        # BIG PENALTY at end if appliances not scheduled
+        unscheduled = np.maximum(self.remaining_durations, 0).sum(axis=1)
+        rewards -= np.where(dones & ~restricted, self.unscheduled_penalty * self.slot_hours * unscheduled, 0.0)
+
+        obs = self._get_obs()
+        infos = [{"TimeLimit.truncated": False} for _ in range(self.num_envs)]
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = obs[i].copy()
+            self.current_hour[dones] = 0
+            self.remaining_durations[dones] = self.durations
+            obs[dones] = self._get_obs()[dones]
+
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        # Problem data and penalties are shared by every episode of the batch
+        if len(self._get_indices(indices)) != self.num_envs:
+            raise ValueError(f"{attr_name} is shared by all {self.num_envs} episodes and can only be set for all")
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+
+class VecEnergyEnvWithPreferences(VecEnergyEnv):
+    """
+    Batched version of EnergyEnvWithPreferences.
+    Comfort penalties are folded into the per-hour cost matrix up front.
+    """
+
+    restricted_penalty = 10.0
+    unscheduled_penalty = 50.0
+
+    def __init__(self, prices, appliances, restricted_hours=None, preferences=None, num_envs=8, slot_minutes=60):
+        self.preferences = preferences or {}
+        super().__init__(prices, appliances, restricted_hours, num_envs=num_envs, slot_minutes=slot_minutes)
+
+    def _comfort_matrix(self):
+        return comfort_matrix(self.appliances, self.num_hours, self.preferences)
+
+
+def _worker(remote, parent_remote, env_cls, env_args, env_kwargs, num_envs, seed):
+    parent_remote.close()
+    env = env_cls(*env_args, num_envs=num_envs, **env_kwargs)
+    env.seed(seed)
+    while True:
+        try:
+            cmd, data = remote.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if cmd == "step":
+            env.step_async(data)
+            remote.send(env.step_wait())
+        elif cmd == "reset":
+            remote.send(env.reset())
+        elif cmd == "get_attr":
+            name, indices = data
+            remote.send(env.get_attr(name, indices))
+        elif cmd == "set_attr":
+            name, value, indices = data
+            remote.send(env.set_attr(name, value, indices))
+        elif cmd == "env_method":
+            name, args, kwargs, indices = data
+            remote.send(env.env_method(name, *args, indices=indices, **kwargs))
+        elif cmd == "close":
+            remote.close()
+            break
+
+
+class ParallelVecEnergyEnv(VecEnv):
+    """
+    Spreads a batched energy env across a pool of worker processes.
+    Each worker owns a contiguous chunk of episodes and steps it with
+    VecEnergyEnv array operations, so IPC happens once per worker per step.
+    Episode i is seeded with seed + i regardless of the worker count.
+    get_attr, set_attr and env_method are forwarded to the workers that own
+    the requested episodes. Attributes are shared by a worker's whole chunk,
+    so set_attr has to cover every episode of each chunk it touches.
+    """
+
+    render_mode = None
+
+    def __init__(self, env_cls, env_args, num_envs=8, n_workers=2, seed=0, start_method=None, env_kwargs=None):
+        self.env_cls = env_cls
+        self.env_args = env_args
+        self.env_kwargs = env_kwargs or {}
+        self.waiting = False
+        self.closed = False
+
+        n_workers = max(1, min(n_workers, num_envs))
+        chunks = np.array_split(np.arange(num_envs), n_workers)
+        self.chunk_bounds = np.cumsum([len(c) for c in chunks])[:-1]
+
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_workers)])
+        self.processes = []
+        for work_remote, remote, chunk in zip(self.work_remotes, self.remotes, chunks):
+            args = (work_remote, remote, env_cls, env_args, self.env_kwargs, len(chunk), seed + int(chunk[0]))
+            # daemon=True: a crashed trainer should not leave workers behind
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        # Local single-episode copy answers spaces and attribute queries
+        self.template = env_cls(*env_args, num_envs=1, **self.env_kwargs)
+        super().__init__(num_envs, self.template.observation_space, self.template.action_space)
+
+    @property
+    def n_workers(self):
+        return len(self.remotes)
+
+    def reset(self):
+        for remote in self.remotes:
+            remote.send(("reset", None))
+        return np.concatenate([remote.recv() for remote in self.remotes])
+
+    def step_async(self, actions):
+        actions = np.asarray(actions).reshape(self.num_envs, -1)
+        for remote, chunk in zip(self.remotes, np.split(actions, self.chunk_bounds)):
+            remote.send(("step", chunk))
+        self.waiting = True
+
+    def step_wait(self):
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        obs, rews, dones, infos = zip(*results)
+        return (
+            np.concatenate(obs),
+            np.concatenate(rews),
+            np.concatenate(dones),
+            [info for chunk in infos for info in chunk],
+        )
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def _route(self, indices):
+        """Owning worker of each requested episode, and {worker: [local episode indices]}."""
+        starts = np.concatenate([[0], self.chunk_bounds])
+        owners, routes = [], {}
+        for i in self._get_indices(indices):
+            worker = int(np.searchsorted(self.chunk_bounds, i, side="right"))
+            owners.append(worker)
+            routes.setdefault(worker, []).append(int(i - starts[worker]))
+        return owners, routes
+
+    def _call(self, cmd, indices, *data):
+        """Send cmd to the workers owning `indices` and gather their answers in request order."""
+        owners, routes = self._route(indices)
+        for worker, local in routes.items():
+            self.remotes[worker].send((cmd, (*data, local)))
+        answers = {worker: iter(self.remotes[worker].recv()) for worker in routes}
+        return [next(answers[worker]) for worker in owners]
+
+    def get_attr(self, attr_name, indices=None):
+        return self._call("get_attr", indices, attr_name)
+
+    def set_attr(self, attr_name, value, indices=None):
+        sizes = np.diff(np.concatenate([[0], self.chunk_bounds, [self.num_envs]]))
+        routes = self._route(indices)[1]
+        for worker, local in routes.items():
+            if len(set(local)) != sizes[worker]:
+                raise ValueError(f"{attr_name} is shared by a worker's {sizes[worker]} episodes "
+                                 "and can only be set for all of them")
+        for worker, local in routes.items():
+            self.remotes[worker].send(("set_attr", (attr_name, value, local)))
+        for worker in routes:
+            self.remotes[worker].recv()
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return self._call("env_method", indices, method_name, method_args, method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+
+def make_training_env(env_cls, vec_env_cls, env_args, n_envs=8, n_workers=1, seed=None, slot_minutes=60):
+    """
+    Training env for the PPO trainers.
+
+    Args:
+        env_cls: Single-episode env (EnergyEnv or EnergyEnvWithPreferences)
+        vec_env_cls: Its batched counterpart (VecEnergyEnv or VecEnergyEnvWithPreferences)
+        env_args: Positional problem arguments shared by both
+        n_envs: Episodes stepped together
+        n_workers: Processes; above 1 the batch is spread over a ParallelVecEnergyEnv
+        seed: Base episode seed for the worker processes
+        slot_minutes: Length of one price slot
+
+    Returns:
+        env: The environment to train on
+        n_envs: Episodes per step (raised to n_workers when there are more workers)
+    """
+    if n_workers > 1:
+        # Process pool: each worker steps its own chunk of the batched episodes
+        n_envs = max(n_envs, n_workers)
+        env = ParallelVecEnergyEnv(
+            vec_env_cls, env_args, num_envs=n_envs, n_workers=n_workers, seed=seed or 0,
+            env_kwargs={"slot_minutes": slot_minutes}
+        )
+    elif n_envs > 1:
+        # Batched env: all episodes advance together with array operations
+        env = vec_env_cls(*env_args, num_envs=n_envs, slot_minutes=slot_minutes)
+    else:
+        from stable_baselines3.common.env_checker import check_env
+
+        env = env_cls(*env_args, slot_minutes=slot_minutes)
+        check_env(env, warn=True)
+    return env, n_envs
+
+
+def learn_and_report(model, env, total_timesteps, n_workers=1, callback=None):
+    """
+    Run model.learn, close env and print the training throughput.
+    The rate is also kept on model.steps_per_second.
+    """
+    start = time.perf_counter()
+    model.learn(total_timesteps=total_timesteps, callback=callback)
+    elapsed = time.perf_counter() - start
+    env.close()
+
+    model.steps_per_second = model.num_timesteps / elapsed
+    print(f"⚡ Trained {model.num_timesteps} timesteps in {elapsed:.1f}s "
+          f"({model.steps_per_second:,.0f} steps/s, {n_workers} worker(s))")
+    return model